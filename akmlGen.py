@@ -1,9 +1,23 @@
 import argparse
-import pandas as pd
+import os
+import re
+import zipfile
+import numpy as np
 import simplekml
 import matplotlib as mpl
-from polycircles import polycircles
-import math
+import tableIO
+import kmlStream
+from geoDistance import simplifyTrack
+
+COLOR_BINS = 64 # number of colors written by streamKML
+
+# Level of detail tiles written by tiledKML
+LOD_TILE_ROWS = 1000 # rows per tile
+LOD_PIXELS = 256 # on screen size of a tile above which its full detail is loaded
+LOD_TOLERANCE = 5.0 # meters, Douglas-Peucker tolerance of the simplified tracks
+LOD_VALUE_TOLERANCE = 0.1 # value change kept by the simplified tracks, fraction of the color range
+LOD_MARGIN = 1e-4 # degrees added around the tile boxes
+LOD_OVERVIEW_ROWS = 100 # max value buckets per tile in the simplified tracks
 
 LATITUDE_COL = "Latitude"
 LONGITUDE_COL = "Longitude"
@@ -12,28 +26,33 @@ ALTITUDE_COL = "Altitude"
 def parseArgs():
     parser = argparse.ArgumentParser(description='Generates a KML file from a CSV file \
                                 given a target field. Assumes the presence of columns named "time", "Latitude", "Longitude", "Altitude".')
-    parser.add_argument('--target', nargs=1,
-                        help='target field to plot from the CSV file',
+    parser.add_argument('--target', action='append',
+                        help='target field to plot from the CSV file, repeat it to plot several targets. With several targets the geometry is computed once \
+                        and one KML per target is written (<output>_<target>.kml, default output is targets.kml), or one KML with a folder per target with --folders. \
+                        Several targets are always written as with --stream, their colors quantized to --colorBins bins of the colormap',
                         required=True)
-    parser.add_argument('--targetUnits', nargs='?',
+    parser.add_argument('--targetUnits', action='append',
                         type=str, 
-                        default = " ",
-                        help='units of the target field, displayed along with target value at each data point.',
+                        default = None,
+                        help='units of the target field, displayed along with target value at each data point. \
+                        Repeat it to give the units of each target, in the order of --target.',
                         required=False)
-    parser.add_argument('--colorMin', nargs='?',
+    parser.add_argument('--colorMin', action='append',
                         type=float, 
                         default = None,
-                        help='min value of the target field, used as lower limit to clip the color map.',
+                        help='min value of the target field, used as lower limit to clip the color map. Repeat it to give one per target.',
                         required=False)
-    parser.add_argument('--colorMax', nargs='?',
+    parser.add_argument('--colorMax', action='append',
                         type=float, 
                         default = None,
-                        help='max value of the target field, used as upper limit to clip the color map.',
+                        help='max value of the target field, used as upper limit to clip the color map. Repeat it to give one per target.',
                         required=False)
     parser.add_argument('--output', nargs='?',
                         help='kml output file - \
-                        default is same as target string',
+                        default is same as target string, or targets.kml with several targets',
                         required=False)
+    parser.add_argument('--folders', action='store_true',
+                        help='with several targets, write one KML with a toggleable folder per target - not available with --lod')
     parser.add_argument('--colormap', nargs='?',
                         default='jet',
                         required=False,
@@ -61,18 +80,50 @@ def parseArgs():
                         default=[], 
                         help= "Units of the fields to display in the pop-up label.")   
     
-    parser.add_argument('csvFile', nargs=1, type=argparse.FileType('r'),
-                        help='CSV Log File')
+    parser.add_argument('--stream', action='store_true',
+                        help='write placemarks straight to the output with one shared style per color bin, \
+                        faster and smaller for long tracks. Outputs ending in .kmz are zipped either way.')
+    parser.add_argument('--colorBins', nargs='?',
+                        type=int,
+                        default=COLOR_BINS,
+                        required=False,
+                        help=f'number of colormap bins (styles) used with --stream, --lod and several targets - default is {COLOR_BINS}')
+    
+    parser.add_argument('--lod', action='store_true',
+                        help='split long tracks into tiles loaded by the viewer only when on screen, \
+                        showing a simplified track until then. Tiles go into the .kmz output or a <output>_tiles directory.')
+    parser.add_argument('--tileRows', nargs='?',
+                        type=int,
+                        default=LOD_TILE_ROWS,
+                        required=False,
+                        help=f'rows per tile with --lod - default is {LOD_TILE_ROWS}')
+    parser.add_argument('--lodTolerance', nargs='?',
+                        type=float,
+                        default=LOD_TOLERANCE,
+                        required=False,
+                        help=f'max distance in meters of the simplified track from the full one with --lod - default is {LOD_TOLERANCE}')
+    parser.add_argument('--lodValueTolerance', nargs='?',
+                        type=float,
+                        default=LOD_VALUE_TOLERANCE,
+                        required=False,
+                        help=f'target value change, as a fraction of the color range, that the simplified track keeps with --lod - default is {LOD_VALUE_TOLERANCE}')
+    
+    parser.add_argument('csvFile', nargs=1,
+                        help='CSV Log File (or Parquet/Feather)')
 
     args = parser.parse_args()
+    if args.folders and args.lod and len(args.target) > 1:
+        parser.error('--folders and --lod cannot be used together, --lod writes one tiled KML per target')
     if args.output == None:
-        args.output = args.target[0]+".kml"
+        # several targets get a fixed stem, target names may hold characters that are not valid in paths
+        args.output = args.target[0]+".kml" if len(args.target) == 1 else "targets.kml"
     return vars(args)
 
 
-# Reads the csv file (needs to have headers) and returns a pandas data frame
-def readCSV(csvFile):
-    csvFileData = pd.read_csv(csvFile, index_col='time', parse_dates=True)
+# Reads the csv file (needs to have headers) and returns a pandas data frame.
+# Parquet and Feather files are read too; columns limits what is loaded from the file
+def readCSV(csvFile, columns=None):
+    csvFileData = tableIO.readTable(csvFile, columns=columns, index_col='time', parse_dates=True)
     return csvFileData
 
 # Creates a popup label, given the
@@ -98,6 +149,105 @@ def createGeomDescription(row, labelCols, labelUnits, targetString, targetUnits,
 
     return description
 
+# WGS84 ellipsoid, used to place the circle vertices around each data point
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
+
+CIRCLE_RADIUS = 1 # meters
+CIRCLE_VERTICES = 12
+
+# Returns the vertices of a circle of radius meters around every (lat, lon, alt),
+# an array of shape (points, numVertices + 1, 3) holding closed (lon, lat, alt) rings.
+# Vertices go clockwise from north like polycircles, from the local radii of curvature
+# of the ellipsoid, which for a few meters matches the geodesic solution.
+def circleVertices(lat, lon, alt, radius=CIRCLE_RADIUS, numVertices=CIRCLE_VERTICES):
+    bearing = np.radians(360.0 / numVertices * np.arange(numVertices + 1))
+    bearing[-1] = 0.0 # closes the ring on the first vertex
+    sinLat2 = np.sin(np.radians(lat)) ** 2
+    meridional = WGS84_A * (1 - WGS84_E2) / (1 - WGS84_E2 * sinLat2) ** 1.5
+    primeVertical = WGS84_A / np.sqrt(1 - WGS84_E2 * sinLat2)
+    dLat = np.degrees(radius / meridional)
+    dLon = np.degrees(radius / (primeVertical * np.cos(np.radians(lat))))
+
+    vertices = np.empty((len(lat), numVertices + 1, 3))
+    vertices[:, :, 0] = lon[:, None] + dLon[:, None] * np.sin(bearing)
+    vertices[:, :, 1] = lat[:, None] + dLat[:, None] * np.cos(bearing)
+    vertices[:, :, 2] = alt[:, None]
+    return vertices
+
+# Returns the smoothed track through the points, smoothRate points per data point
+#  - points: (lon, lat, alt) array of each track point, the first one is drawn on its own,
+#            every other one as a segment back to the previous track point
+#  - owner: data point each track point belongs to (the last data point has none)
+#  - ratio: position of each track point between its data point and the next one
+def trackSegments(lon, lat, alt, smoothRate):
+    n = len(lon)
+    if n < 2:
+        points = np.column_stack((lon, lat, alt))
+        return points, np.zeros(n, dtype=int), np.zeros(n)
+
+    owner = np.repeat(np.arange(n - 1), smoothRate)
+    ratio = np.tile(np.arange(smoothRate) / smoothRate, n - 1)
+
+    points = np.empty((len(owner), 3))
+    points[:, 0] = np.round(blend(lon, owner, ratio), 6)
+    points[:, 1] = np.round(blend(lat, owner, ratio), 6)
+    points[:, 2] = np.abs(np.round(blend(alt, owner, ratio), 3))
+    points[0] = (lon[0], lat[0], alt[0]) # the first data point is just a point
+    return points, owner, ratio
+
+# Returns the values (rows of an array) at the track points, blended between
+# the value of their data point and the one of the next data point
+def blend(values, owner, ratio):
+    nxt = np.minimum(owner + 1, len(values) - 1)
+    if values.ndim > 1:
+        ratio = ratio[:, None]
+    return values[owner] + (values[nxt] - values[owner]) * ratio
+
+# Returns the KML (aabbggrr) color strings of integer rgb rows
+def kmlColors(rgb):
+    return [simplekml.Color.rgb(r, g, b) for r, g, b in rgb.tolist()]
+
+# Returns one shared simplekml style per distinct color, made by newStyle(color).
+# simplekml looks up every style a feature adds in a list, so one style per
+# feature makes writing the document quadratic in the number of features.
+def sharedStyles(colors, newStyle):
+    return {color: newStyle(color) for color in dict.fromkeys(colors)}
+
+def polygonStyle(color):
+    style = simplekml.Style()
+    style.polystyle.color = color
+    return style
+
+def lineStyle(color, linewidth):
+    style = simplekml.Style()
+    style.linestyle.width = linewidth
+    style.linestyle.color = color
+    style.linestyle.gxlabelvisibility = True
+    return style
+
+# Returns the rows of csvFileData that have a location (the others are not drawn)
+# and their longitude, latitude and altitude arrays
+def locatedRows(csvFileData):
+    located = csvFileData[[LONGITUDE_COL, LATITUDE_COL, ALTITUDE_COL]].notna().all(axis=1)
+    data = csvFileData[located.to_numpy()]
+    lon = data[LONGITUDE_COL].to_numpy(dtype=float)
+    lat = data[LATITUDE_COL].to_numpy(dtype=float)
+    alt = data[ALTITUDE_COL].to_numpy(dtype=float)
+    return data, lon, lat, alt
+
+# Returns the popup label of every row of data, see createGeomDescription.
+# targetString and targetUnits may be lists of targets: the label then shows all
+# of them, the first one in place of the target and the others as label fields.
+def createGeomDescriptions(data, labelCols, labelUnits, targetString, targetUnits, customLabel):
+    if isinstance(targetString, list):
+        labelCols = list(targetString[1:]) + list(labelCols)
+        labelUnits = list(targetUnits[1:]) + list(labelUnits)
+        targetString, targetUnits = targetString[0], targetUnits[0]
+    descColumns = list(dict.fromkeys([LATITUDE_COL, LONGITUDE_COL, ALTITUDE_COL, targetString] + list(labelCols)))
+    return [createGeomDescription(dict(zip(descColumns, row)), labelCols, labelUnits, targetString, targetUnits, customLabel)
+            for row in zip(*(data[col].to_numpy() for col in descColumns))]
+
 # Generates and saves a KML file given
 #  - the data in the csvFileData (a pandas dataframe)
 #  - the target string (what column to plot)
@@ -110,6 +260,8 @@ def createGeomDescription(row, labelCols, labelUnits, targetString, targetUnits,
 #  - custom label
 #  - label fields
 #  - label field units
+# Colors, circles and line segments of all rows are computed as arrays first,
+# the loop at the end only writes the KML.
 def generateKML(csvFileData, targetString, targetUnits, colorMin, colorMax, outputFileName, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits):
     zeColorMap = mpl.colormaps[colorMap]
     kml = simplekml.Kml()
@@ -117,105 +269,291 @@ def generateKML(csvFileData, targetString, targetUnits, colorMin, colorMax, outp
     minVal = colorMin if colorMin else csvFileData[targetString].min()
     maxVal = colorMax if colorMax else csvFileData[targetString].max()
 
-    prev_loc = None
-    row_int_pos = 0
-    for index, row in csvFileData.iterrows():
-        scaledValue = (row[targetString] - minVal) / (maxVal-minVal)
-        rgb_r = zeColorMap(scaledValue)
-        lon = row[LONGITUDE_COL]
-        lat = row[LATITUDE_COL]
-        alt = row[ALTITUDE_COL]
-
-        emp = math.isnan(lon) or math.isnan(lat) or math.isnan(alt)
-
-        if emp:
-            continue
-
-        zeColor = simplekml.Color.rgb(
-            int(rgb_r[0]*255), int(rgb_r[1]*255), int(rgb_r[2]*255))
-        pc = polycircles.Polycircle(
-            latitude=lat, longitude=lon, radius=1, number_of_vertices=12)
-        res = pc.to_kml()
-        all = []
-        for i in res:
-            withAlt = list(i)
-            withAlt.append(float(alt))
-            all.append(withAlt)
-        cir = kml.newpolygon(name=row[targetString], outerboundaryis=all)
-        cir.style.polystyle.color = zeColor
+    data, lon, lat, alt = locatedRows(csvFileData)
+    values = data[targetString].to_numpy()
+
+    scaledValues = (values.astype(float) - minVal) / (maxVal-minVal)
+    rgba = zeColorMap(scaledValues)
+    circleColors = kmlColors((rgba[:, :3] * 255).astype(int))
+    circleStyles = sharedStyles(circleColors, polygonStyle)
+    circles = circleVertices(lat, lon, alt).tolist()
+
+    descriptions = createGeomDescriptions(data, labelCols, labelUnits, targetString, targetUnits, customLabel)
+
+    segmentBounds = np.zeros(len(data) + 1, dtype=int)
+    if (linewidth > 0):
+        points, owner, ratio = trackSegments(lon, lat, alt, smoothRate)
+        points = [tuple(point) for point in points.tolist()]
+        segmentColors = kmlColors((blend(rgba[:, :3], owner, ratio) * 255).astype(int))
+        segmentStyles = sharedStyles(segmentColors, lambda color: lineStyle(color, linewidth))
+        segmentBounds = np.searchsorted(owner, np.arange(len(data) + 1))
+
+    for i in range(len(data)):
+        cir = kml.newpolygon(name=values[i], outerboundaryis=circles[i])
+        cir.style = circleStyles[circleColors[i]]
         cir.altitudemode = simplekml.AltitudeMode.relativetoground
-        cir.description = createGeomDescription(row, labelCols, labelUnits, targetString, targetUnits, customLabel)
-
-        #        if False:
-        #            pnt = kml.newpoint()
-        #            pnt.altitudemode = simplekml.AltitudeMode.relativetoground
-        #            pnt.name = row[targetString]
-        #            pnt.coords = [(lon, lat, alt)]
-
-        #            pnt.style.balloonstyle.text = row[targetString]
-        #            pnt.style.balloonstyle.textcolor = zeColor
-        #            pnt.style.balloonstyle.scale = 0.1
-        #            pnt.style.balloonstyle.displayMode = simplekml.DisplayMode.hide
-        #        pnt.style.labelstyle.color = zeColor  # Make the text match
-        #        pnt.style.labelstyle.scale = 0.5  # Make the text twice as big
-        #        pnt.style.iconstyle.icon.href = 'http://maps.google.com/mapfiles/kml/shapes/placemark_circle.png'
-
-        if (linewidth > 0):
-            ind = csvFileData.index.get_loc(index)
-            for step in range(smoothRate):
-                ls = kml.newlinestring()
-                ls.name = row[targetString]
-                ls.label = row[targetString]
-                ls.altitudemode = simplekml.AltitudeMode.relativetoground
-                ls.style.linestyle.width = linewidth
-                ls.style.linestyle.color = zeColor
-                ls.style.linestyle.gxlabelvisibility = True
-
-                if not prev_loc:  # first data point is just a point
-                    ls.coords = [(lon, lat, alt)]
-                    prev_loc = (lon, lat, alt)
-                else:  # all the others are segments
-                    # Gradient operation
-                    if (ind + 1) >= len(csvFileData.index):
-                        continue
-                    _f_row = csvFileData.iloc[(ind+1)]
-                    _f_loc = (_f_row[LONGITUDE_COL],
-                              _f_row[LATITUDE_COL], _f_row[ALTITUDE_COL])
-                    _f_val = (_f_row[targetString] - minVal) / (maxVal-minVal)
-                    ratio = step / smoothRate
-
-                    _lon = round(lon + (_f_loc[0] - lon) * ratio, 6)
-                    _lat = round(lat + (_f_loc[1] - lat) * ratio, 6)
-                    _alt = abs(round(alt + (_f_loc[2] - alt) * ratio, 3))
-
-                    _rgb_c = zeColorMap(scaledValue)
-                    _rgb_p = zeColorMap(_f_val)
-
-                    _rgb_0 = (_rgb_c[0] + (_rgb_p[0] -
-                              _rgb_c[0]) * ratio) * 255
-                    _rgb_1 = (_rgb_c[1] + (_rgb_p[1] -
-                              _rgb_c[1]) * ratio) * 255
-                    _rgb_2 = (_rgb_c[2] + (_rgb_p[2] -
-                              _rgb_c[2]) * ratio) * 255
-
-                    zeColor = simplekml.Color.rgb(
-                        int(_rgb_0), int(_rgb_1), int(_rgb_2))
-                    ls.style.linestyle.color = zeColor
-                    ls.coords = [(_lon, _lat, _alt), prev_loc]
-                    prev_loc = (_lon, _lat, _alt)
-
-        row_int_pos += 1
-
-                    
-    # Saves the kml file
-    kml.save(outputFileName)
+        cir.description = descriptions[i]
+
+        for k in range(segmentBounds[i], segmentBounds[i + 1]):
+            ls = kml.newlinestring()
+            ls.name = values[i]
+            ls.altitudemode = simplekml.AltitudeMode.relativetoground
+            ls.style = segmentStyles[segmentColors[k]]
+            ls.coords = [points[k]] if k == 0 else [points[k], points[k - 1]]
+
+    # Saves the kml file, unformatted: pretty printing reparses the whole document
+    if outputFileName.lower().endswith(".kmz"):
+        kml.savekmz(outputFileName, format=False)
+    else:
+        kml.save(outputFileName, format=False)
+
+# Returns the geometry drawn by the streamed outputs, as a dict of
+#  - data, lon, lat, alt: the located rows (see locatedRows)
+#  - circles: vertex rows of the circle around each row
+#  - descriptions: popup label of each row, showing every target when targetString is a list
+#  - points, owner, ratio: the smoothed track (see trackSegments), empty when linewidth is 0
+#  - segmentBounds: track points of row i are points[segmentBounds[i]:segmentBounds[i + 1]]
+def trackGeometry(csvFileData, targetString, targetUnits, linewidth, smoothRate, customLabel, labelCols, labelUnits):
+    data, lon, lat, alt = locatedRows(csvFileData)
+    geometry = {"data": data, "lon": lon, "lat": lat, "alt": alt}
+    geometry["circles"] = [kmlStream.coordinates(ring) for ring in circleVertices(lat, lon, alt).tolist()]
+    geometry["descriptions"] = createGeomDescriptions(data, labelCols, labelUnits, targetString, targetUnits, customLabel)
+
+    geometry["points"], geometry["owner"], geometry["ratio"] = [], np.zeros(0, dtype=int), np.zeros(0)
+    geometry["segmentBounds"] = np.zeros(len(data) + 1, dtype=int)
+    if (linewidth > 0):
+        points, owner, ratio = trackSegments(lon, lat, alt, smoothRate)
+        geometry["points"], geometry["owner"], geometry["ratio"] = points.tolist(), owner, ratio
+        geometry["segmentBounds"] = np.searchsorted(owner, np.arange(len(data) + 1))
+    return geometry
+
+# Returns the color bins of the circles and of the track points of geometry
+# and the values scaled to the color map
+def trackBins(geometry, targetString, minVal, maxVal, colorBins):
+    values = geometry["data"][targetString].to_numpy(dtype=float)
+    scaledValues = (values - minVal) / (maxVal-minVal)
+    circleBins = colorBin(scaledValues, colorBins)
+    segmentBins = colorBin(blend(scaledValues, geometry["owner"], geometry["ratio"]), colorBins) \
+        if len(geometry["owner"]) else np.zeros(0, dtype=int)
+    return circleBins, segmentBins, scaledValues
+
+# Returns the color map bin (0 to bins - 1) of scaled values, -1 for missing values
+def colorBin(scaledValues, bins):
+    index = np.minimum(np.floor(np.clip(scaledValues, 0, 1) * bins), bins - 1)
+    return np.where(np.isnan(index), -1, index).astype(int)
+
+def binStyle(b):
+    return "nodata" if b < 0 else f"c{b}"
+
+# Writes one style per color bin in bins
+def writeBinStyles(kml, bins, zeColorMap, colorBins, linewidth):
+    for b in np.unique(bins).tolist():
+        rgba = zeColorMap(np.nan if b < 0 else (b + 0.5) / colorBins)
+        color = kmlStream.kmlColor([int(c * 255) for c in rgba[:3]])
+        kml.style(binStyle(b), color, lineWidth=linewidth if linewidth > 0 else None)
+
+# Writes the circles and track segments of rows start to stop of geometry, named by the target values
+def writePlacemarks(kml, geometry, targetString, circleBins, segmentBins, start, stop):
+    circles, descriptions = geometry["circles"], geometry["descriptions"]
+    names = [str(value) for value in geometry["data"][targetString].to_numpy()[start:stop]]
+    points, segmentBounds = geometry["points"], geometry["segmentBounds"]
+    for i in range(start, stop):
+        kml.polygon(circles[i], "#" + binStyle(circleBins[i]), name=names[i - start], description=descriptions[i])
+
+        for k in range(segmentBounds[i], segmentBounds[i + 1]):
+            coords = [points[k]] if k == 0 else [points[k], points[k - 1]]
+            kml.lineString(coords, "#" + binStyle(segmentBins[k]), name=names[i - start])
+
+# Like generateKML, but writes the placemarks straight to the output file (zipped if it
+# ends with .kmz) instead of building a simplekml document. Colors are quantized
+# to colorBins bins of the color map, each written once as a shared style.
+# geometry may be given when it is shared by several targets, see trackGeometry.
+def streamKML(csvFileData, targetString, targetUnits, colorMin, colorMax, outputFileName, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits, colorBins=COLOR_BINS, geometry=None):
+    zeColorMap = mpl.colormaps[colorMap]
+
+    minVal = colorMin if colorMin else csvFileData[targetString].min()
+    maxVal = colorMax if colorMax else csvFileData[targetString].max()
+
+    if geometry is None:
+        geometry = trackGeometry(csvFileData, targetString, targetUnits, linewidth, smoothRate, customLabel, labelCols, labelUnits)
+    circleBins, segmentBins, _ = trackBins(geometry, targetString, minVal, maxVal, colorBins)
+
+    with kmlStream.KmlWriter(outputFileName, name=targetString) as kml:
+        writeBinStyles(kml, np.concatenate((circleBins, segmentBins)), zeColorMap, colorBins, linewidth)
+        writePlacemarks(kml, geometry, targetString, circleBins, segmentBins, 0, len(geometry["data"]))
+
+# Returns the mask of the values that have moved more than tolerance
+# (a fraction of the color range) away from the last kept value
+def valueKeypoints(scaledValues, tolerance):
+    keep = np.zeros(len(scaledValues), dtype=bool)
+    last = np.nan
+    for i, value in enumerate(scaledValues.tolist()):
+        if not abs(value - last) <= tolerance: # also true when either is NaN
+            keep[i] = True
+            last = value
+    return keep
+
+# Writes the coarse version of rows start to stop of geometry. The values are averaged over
+# buckets of rows, at most LOD_OVERVIEW_ROWS per tile, and the path goes through the rows kept by
+# Douglas-Peucker simplification (tolerance meters) and the buckets where the average moved by
+# more than valueTolerance. One line string is written per run of the same color bin.
+def writeCoarseTrack(kml, geometry, scaledValues, colorBins, start, stop, tolerance, valueTolerance):
+    stop = min(stop + 1, len(scaledValues)) # also runs to the first row of the next tile
+    lon, lat, alt = geometry["lon"][start:stop], geometry["lat"][start:stop], geometry["alt"][start:stop]
+    values = scaledValues[start:stop]
+
+    bucket = max(1, -(-len(values) // LOD_OVERVIEW_ROWS))
+    bucketStarts = np.arange(0, len(values), bucket)
+    valid = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(np.where(valid, values, 0), bucketStarts) / np.add.reduceat(valid, bucketStarts)
+
+    keep = simplifyTrack(lon, lat, tolerance)
+    keep[bucketStarts[valueKeypoints(means, valueTolerance)]] = True
+    kept = np.flatnonzero(keep)
+    bins = colorBin(means[kept // bucket], colorBins)
+    coords = np.column_stack((lon[kept], lat[kept], alt[kept])).tolist()
+
+    runStarts = np.flatnonzero(np.diff(bins[:-1], prepend=np.nan) != 0) if len(kept) > 1 else []
+    runEnds = list(runStarts[1:]) + [len(kept) - 1]
+    for runStart, runEnd in zip(runStarts, runEnds):
+        kml.lineString(coords[runStart:runEnd + 1], "#" + binStyle(bins[runStart]))
+
+# Like streamKML, but splits the track into tiles of consecutive rows, each in its own
+# document loaded through a NetworkLink once its Region is large enough on screen.
+# Until then the main document shows a simplified track of the tile.
+# With a .kmz output the tiles are stored in the archive, otherwise in a <output>_tiles directory.
+def tiledKML(csvFileData, targetString, targetUnits, colorMin, colorMax, outputFileName, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits, colorBins=COLOR_BINS,
+             tileRows=LOD_TILE_ROWS, tolerance=LOD_TOLERANCE, valueTolerance=LOD_VALUE_TOLERANCE, geometry=None):
+    zeColorMap = mpl.colormaps[colorMap]
+
+    minVal = colorMin if colorMin else csvFileData[targetString].min()
+    maxVal = colorMax if colorMax else csvFileData[targetString].max()
+
+    if geometry is None:
+        geometry = trackGeometry(csvFileData, targetString, targetUnits, linewidth, smoothRate, customLabel, labelCols, labelUnits)
+    circleBins, segmentBins, scaledValues = trackBins(geometry, targetString, minVal, maxVal, colorBins)
+    allBins = np.concatenate((circleBins, segmentBins))
+    lon, lat = geometry["lon"], geometry["lat"]
+
+    archive = None
+    if outputFileName.lower().endswith(".kmz"):
+        archive = zipfile.ZipFile(outputFileName, "w", zipfile.ZIP_DEFLATED)
+        root, tileDir, tileHref = kmlStream.KmlWriter("doc.kml", name=targetString, archive=archive), None, "tiles"
+    else:
+        root = kmlStream.KmlWriter(outputFileName, name=targetString)
+        tileDir = os.path.splitext(outputFileName)[0] + "_tiles"
+        tileHref = os.path.basename(tileDir)
+        os.makedirs(tileDir, exist_ok=True)
+
+    tiles = []
+    for start in range(0, len(lon), tileRows):
+        stop = min(start + tileRows, len(lon))
+        box = (lat[start:stop].max() + LOD_MARGIN, lat[start:stop].min() - LOD_MARGIN,
+               lon[start:stop].max() + LOD_MARGIN, lon[start:stop].min() - LOD_MARGIN)
+        tiles.append((len(tiles), start, stop, box))
+
+    # a zip archive takes one document at a time: the main one first, then the tiles
+    with root:
+        writeBinStyles(root, allBins, zeColorMap, colorBins, max(linewidth, 1))
+        for tile, start, stop, box in tiles:
+            root.openFolder(f"{targetString} {tile} (overview)", region=kmlStream.region(*box, maxLodPixels=LOD_PIXELS))
+            writeCoarseTrack(root, geometry, scaledValues, colorBins, start, stop, tolerance, valueTolerance)
+            root.closeFolder()
+            root.networkLink(f"{targetString} {tile}", f"{tileHref}/tile_{tile}.kml", region=kmlStream.region(*box, minLodPixels=LOD_PIXELS))
+
+    for tile, start, stop, box in tiles:
+        if archive is not None:
+            tileKml = kmlStream.KmlWriter(f"{tileHref}/tile_{tile}.kml", name=f"{targetString} {tile}", archive=archive)
+        else:
+            tileKml = kmlStream.KmlWriter(os.path.join(tileDir, f"tile_{tile}.kml"), name=f"{targetString} {tile}")
+        with tileKml:
+            tileRange = slice(geometry["segmentBounds"][start], geometry["segmentBounds"][stop])
+            writeBinStyles(tileKml, np.concatenate((circleBins[start:stop], segmentBins[tileRange])), zeColorMap, colorBins, linewidth)
+            writePlacemarks(tileKml, geometry, targetString, circleBins, segmentBins, start, stop)
+    if archive is not None:
+        archive.close()
+
+# Returns one value per target from a command line list: the given values,
+# a single value used for every target, or default when there is none
+def perTarget(values, targets, default=None):
+    if not values:
+        return [default] * len(targets)
+    if len(values) == 1:
+        return list(values) * len(targets)
+    if len(values) != len(targets):
+        raise Exception("Give one value, or one value per target.")
+    return list(values)
+
+# Returns the output file of target when each target gets its own file
+def targetOutputName(outputFileName, targetString):
+    stem, ext = os.path.splitext(outputFileName)
+    return f"{stem}_{re.sub(r'[^A-Za-z0-9.-]+', '_', targetString).strip('_')}{ext or '.kml'}"
+
+# Writes the KML of several targets, computing the circles, track segments and
+# popup labels (which show every target) once. Each target gets its own file
+# (see targetOutputName) written with streamKML, or tiledKML when lod, or with
+# folders one folder per target in outputFileName, of which only the first is shown.
+# Folders are not tiled, folders and lod together raise a ValueError.
+# targetUnits, colorMin and colorMax hold one value per target.
+def multiTargetKML(csvFileData, targets, targetUnits, colorMin, colorMax, outputFileName, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits, colorBins=COLOR_BINS,
+                   folders=False, lod=False, tileRows=LOD_TILE_ROWS, tolerance=LOD_TOLERANCE, valueTolerance=LOD_VALUE_TOLERANCE):
+    if folders and lod:
+        raise ValueError("Folders cannot be tiled, write one file per target with lod")
+    geometry = trackGeometry(csvFileData, list(targets), list(targetUnits), linewidth, smoothRate, customLabel, labelCols, labelUnits)
+
+    if not folders:
+        for target, units, minVal, maxVal in zip(targets, targetUnits, colorMin, colorMax):
+            output = targetOutputName(outputFileName, target)
+            if lod:
+                tiledKML(csvFileData, target, units, minVal, maxVal, output, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits, colorBins,
+                         tileRows, tolerance, valueTolerance, geometry=geometry)
+            else:
+                streamKML(csvFileData, target, units, minVal, maxVal, output, colorMap, linewidth, smoothRate, customLabel, labelCols, labelUnits, colorBins,
+                          geometry=geometry)
+        return
+
+    zeColorMap = mpl.colormaps[colorMap]
+    targetBins = []
+    for target, minVal, maxVal in zip(targets, colorMin, colorMax):
+        minVal = minVal if minVal else csvFileData[target].min()
+        maxVal = maxVal if maxVal else csvFileData[target].max()
+        targetBins.append(trackBins(geometry, target, minVal, maxVal, colorBins)[:2])
 
+    with kmlStream.KmlWriter(outputFileName, name=", ".join(targets)) as kml:
+        writeBinStyles(kml, np.concatenate([np.concatenate(bins) for bins in targetBins]), zeColorMap, colorBins, linewidth)
+        for i, (target, (circleBins, segmentBins)) in enumerate(zip(targets, targetBins)):
+            kml.openFolder(target, visible=(i == 0))
+            writePlacemarks(kml, geometry, target, circleBins, segmentBins, 0, len(geometry["data"]))
+            kml.closeFolder()
 
 def main():
     args = parseArgs()
     # Define args for drawtype (line or point or both)
-    csvFileData = readCSV(args['csvFile'][0])
-    generateKML(csvFileData, args['target'][0], args['targetUnits'], args['colorMin'], args['colorMax'],
+    targets = args['target']
+    columns = targets + [LATITUDE_COL, LONGITUDE_COL, ALTITUDE_COL] + args['labelCols']
+    csvFileData = readCSV(args['csvFile'][0], columns)
+    targetUnits = perTarget(args['targetUnits'], targets, " ")
+    colorMin = perTarget(args['colorMin'], targets)
+    colorMax = perTarget(args['colorMax'], targets)
+    if len(targets) > 1:
+        multiTargetKML(csvFileData, targets, targetUnits, colorMin, colorMax,
+                       args['output'], args['colormap'], args['linewidth'], args['smooth'],
+                       args['customLabel'], args['labelCols'], args['labelUnits'], args['colorBins'],
+                       args['folders'], args['lod'], args['tileRows'], args['lodTolerance'], args['lodValueTolerance'])
+        return
+    if args['lod']:
+        tiledKML(csvFileData, targets[0], targetUnits[0], colorMin[0], colorMax[0],
+                 args['output'], args['colormap'], args['linewidth'], args['smooth'],
+                 args['customLabel'], args['labelCols'], args['labelUnits'], args['colorBins'],
+                 args['tileRows'], args['lodTolerance'], args['lodValueTolerance'])
+        return
+    if args['stream']:
+        streamKML(csvFileData, targets[0], targetUnits[0], colorMin[0], colorMax[0],
+                  args['output'], args['colormap'], args['linewidth'], args['smooth'],
+                  args['customLabel'], args['labelCols'], args['labelUnits'], args['colorBins'])
+        return
+    generateKML(csvFileData, targets[0], targetUnits[0], colorMin[0], colorMax[0],
                 args['output'], args['colormap'], args['linewidth'], args['smooth'], 
                 args['customLabel'], args['labelCols'], args['labelUnits'])    
 
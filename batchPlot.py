@@ -0,0 +1,179 @@
+import argparse
+import csv
+import os
+import re
+import sys
+import glob
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use("Agg") # headless, also in the worker processes importing this module
+import matplotlib.pyplot as plt
+import improved_plot
+from plotReduce import DOWNSAMPLE_METHODS, MAX_POINTS
+
+# Renders the improved_plot figures of many CSVs to image files, without a display.
+# The jobs come from a manifest CSV with columns csv, x, y, type (scatter or line)
+# and optionally output, or are made for the merged CSVs of experiment directories.
+# Jobs are grouped by CSV, so each CSV is loaded once by the worker that draws its figures.
+
+DEFAULT_EXPERIMENTS = "jan_*"
+
+# y columns drawn for every discovered merged CSV that has them
+DEFAULT_Y_COLUMNS = ("Bandwidth(MBits/sec)", "pingtime")
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Render improved_plot figures to files in parallel, without a display.')
+    parser.add_argument('experiments', nargs='*',
+                        help=f'experiment directories whose merged_csvs are plotted - default is {DEFAULT_EXPERIMENTS}')
+    parser.add_argument('-m', '--manifest',
+                        help='CSV of jobs with columns csv, x, y, type and optionally output, instead of the experiments')
+    parser.add_argument('-o', '--outdir',
+                        help='directory of the figures - default is the figures directory of each experiment, '
+                             'or the directory of the manifest. With several experiments, the figures of each '
+                             'go into a subdirectory named after it')
+    parser.add_argument('-x', '--x_axis', default="time",
+                        help='x axis of the discovered jobs')
+    parser.add_argument('-t', '--graph_type', choices=['scatter', 'line'], default="scatter",
+                        help='graph type of the discovered jobs')
+    parser.add_argument('--format', default="png",
+                        help='image format (extension) of the discovered jobs and of the manifest jobs '
+                             'without an output - default is png')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--distance', choices=['start', 'path', '3d'], default='start',
+                        help='distance drawn on the right axis, see improved_plot')
+    parser.add_argument('--invert-distance', action='store_true')
+    parser.add_argument('--downsample', choices=DOWNSAMPLE_METHODS, default=None,
+                        help='plot about --max-points rows per series, see plotReduce')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS)
+    parser.add_argument('--aggregate', type=float, default=None,
+                        help='plot the mean of y over buckets of this many seconds')
+    return parser.parse_args()
+
+def figureName(csvFile, yColumn, fmt):
+    return f"{Path(csvFile).stem}_{re.sub(r'[^A-Za-z0-9.-]+', '_', yColumn).strip('_')}.{fmt}"
+
+def readManifest(manifest, outdir=None, fmt="png"):
+    """ returns the jobs of a manifest: dicts with csv, x, y, type and output,
+        relative paths are taken from the directory of the manifest.
+        Rows without an output are drawn to <csv name>_<y>.<fmt>
+    """
+    base = Path(manifest).parent
+    jobs = []
+    with open(manifest, newline="") as f:
+        for row in csv.DictReader(f):
+            csvFile = base / row["csv"]
+            output = row.get("output") or figureName(csvFile, row["y"], fmt)
+            output = Path(outdir) / output if outdir else base / output
+            jobs.append({"csv": str(csvFile), "x": row.get("x") or "time", "y": row["y"],
+                         "type": row.get("type") or "scatter", "output": str(output)})
+    return jobs
+
+def discoverJobs(experiments, x, graphType, fmt, outdir=None):
+    """ returns a job per DEFAULT_Y_COLUMNS column found in the merged CSVs of the experiments,
+        drawn to <experiment>/figures/<csv name>_<y>.<fmt>, or into outdir - in a subdirectory
+        per experiment when there are several, as their CSVs share names (e.g. lw1_iperf.csv)
+    """
+    jobs = []
+    for expDir in experiments:
+        if not outdir:
+            figDir = Path(expDir) / "figures"
+        elif len(experiments) > 1:
+            figDir = Path(outdir) / Path(expDir).resolve().name
+        else:
+            figDir = Path(outdir)
+        for csvFile in sorted(Path(expDir).glob("merged_csvs/*.csv")):
+            with open(csvFile, newline="") as f:
+                header = next(csv.reader(f), [])
+            for y in DEFAULT_Y_COLUMNS:
+                if y in header:
+                    jobs.append({"csv": str(csvFile), "x": x, "y": y, "type": graphType,
+                                 "output": str(figDir / figureName(csvFile, y, fmt))})
+    return jobs
+
+def renderCsv(csvFile, jobs, options):
+    """ draws the figures of the jobs of one CSV, loading it once. Runs in a worker process.
+        Returns the (output, error) of each job, error is None when it was drawn.
+    """
+    columns = set()
+    for job in jobs:
+        columns |= improved_plot.required_columns(job["x"], job["y"], options["distance_kind"])
+    try:
+        data = improved_plot.read_plot_data(csvFile, columns)
+    except Exception as e:
+        return [(job["output"], f"{type(e).__name__}: {e}") for job in jobs]
+
+    results = []
+    for job in jobs:
+        try:
+            fig = improved_plot.render_plot(data, job["x"], job["y"], job["type"],
+                                            invert_distance=options["invert_distance"],
+                                            distance_kind=options["distance_kind"],
+                                            downsample=options["downsample"],
+                                            max_points=options["max_points"],
+                                            aggregate=options["aggregate"])
+            if fig is None:
+                results.append((job["output"], "missing columns"))
+                continue
+            os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+            fig.savefig(job["output"], dpi=options["dpi"])
+            plt.close(fig)
+            results.append((job["output"], None))
+        except Exception as e:
+            plt.close("all")
+            results.append((job["output"], f"{type(e).__name__}: {e}"))
+    return results
+
+def duplicateOutputs(jobs):
+    """ returns the outputs of more than one job, which would overwrite each other """
+    seen, duplicates = set(), set()
+    for job in jobs:
+        output = os.path.abspath(job["output"])
+        (duplicates if output in seen else seen).add(output)
+    return sorted(duplicates)
+
+def renderAll(jobs, options, workers=None):
+    """ draws all jobs with a pool of worker processes, one task per CSV.
+        Returns the number of failed jobs.
+    """
+    byCsv = {}
+    for job in jobs:
+        byCsv.setdefault(job["csv"], []).append(job)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(renderCsv, csvFile, csvJobs, options) for csvFile, csvJobs in byCsv.items()]
+        for future in as_completed(futures):
+            for output, error in future.result():
+                if error:
+                    failed += 1
+                    print(f"Error {output}: {error}")
+                else:
+                    print(output)
+    return failed
+
+def main():
+    args = parseArgs()
+    if args.manifest:
+        jobs = readManifest(args.manifest, args.outdir, args.format)
+    else:
+        experiments = args.experiments or sorted(glob.glob(DEFAULT_EXPERIMENTS))
+        jobs = discoverJobs(experiments, args.x_axis, args.graph_type, args.format, args.outdir)
+    if not jobs:
+        print("No figures to draw")
+        return
+    # Checked before any worker starts, two jobs drawing the same file would race
+    duplicates = duplicateOutputs(jobs)
+    if duplicates:
+        sys.exit("Several jobs draw the same figure, give them different outputs:\n" + "\n".join(duplicates))
+    options = {"distance_kind": args.distance, "invert_distance": args.invert_distance,
+               "downsample": args.downsample, "max_points": args.max_points,
+               "aggregate": args.aggregate, "dpi": args.dpi}
+    failed = renderAll(jobs, options, args.jobs)
+    print(f"{len(jobs) - failed} of {len(jobs)} figures drawn")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+""" Times csvMerge.mergeFrames on synthetic inputs of growing size, to check that
+    merging scales linearly with the number of rows.
+
+    usage: python benchmarks/bench_csvMerge.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import csvMerge
+
+
+def syntheticFrames(rows, seed=0):
+    """ builds a high-rate traffic frame (file1) and a 1 Hz vehicle track (file2)
+        covering the same interval, both indexed by time like the parsed CSVs
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2026-01-20 17:44:20")
+    t1 = start + pd.to_timedelta(np.sort(rng.uniform(0, rows / 10, rows)), unit="s")
+    traffic = pd.DataFrame({
+        "Bandwidth(MBits/sec)": rng.uniform(0, 30, rows),
+        "Latency(sec)": rng.uniform(0.005, 0.1, rows)
+    }, index=pd.DatetimeIndex(t1, name="time"))
+
+    seconds = int(rows / 10) + 1
+    t2 = start + pd.to_timedelta(np.arange(seconds) + 0.5, unit="s")
+    vehicle = pd.DataFrame({
+        "Longitude": -78.6962748 + np.cumsum(rng.normal(0, 1e-6, seconds)),
+        "Latitude": 35.7273024 + np.cumsum(rng.normal(0, 1e-6, seconds)),
+        "Altitude": np.abs(np.cumsum(rng.normal(0, 0.1, seconds)))
+    }, index=pd.DatetimeIndex(t2, name="time"))
+    return traffic, vehicle
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark csvMerge on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000],
+                        help='rows of the high-rate input')
+    parser.add_argument('--format', choices=['c', 'i'], default='i',
+                        help='merge format, copy (c) or interpolate (i)')
+    parser.add_argument('--align', choices=['concat', 'asof'], default='concat',
+                        help='csvMerge alignment mode')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'seconds':>10} {'us/row':>10}")
+    for rows in args.sizes:
+        traffic, vehicle = syntheticFrames(rows)
+        start = time.perf_counter()
+        csvMerge.mergeFrames(traffic, vehicle, args.format, align=args.align)
+        elapsed = time.perf_counter() - start
+        print(f"{rows:>10} {elapsed:>10.3f} {elapsed / rows * 1e6:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+""" Times the pipeline on synthetic logs (see logGenerators) of growing size and
+    writes the results as JSON, so runs can be compared over time.
+
+    Stages:
+     - log2csv: parses and writes the log of each mode
+     - csvMerge: merges the parsed iperfClient and vehicleOut tables (interpolated)
+     - generateKML, streamKML: draw the Bandwidth of the merged table (akmlGen)
+     - distance: the start, path and 3d distances improved_plot draws (compute_distance)
+    Each stage runs in its own process, which reports the time of the stage itself;
+    its peak resident memory comes from the OS (os.wait4, Unix only).
+
+    usage: python benchmarks/bench_pipeline.py [--sizes 1000 100000] [--modes ue ping]
+               [--stages log2csv csvMerge] [--output results.json] [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+import logGenerators
+
+STAGES = ("log2csv", "csvMerge", "generateKML", "streamKML", "distance")
+
+# Parsed tables the downstream stages start from
+MERGE_MODES = ("iperfClient", "vehicleOut")
+
+KML_TARGET = "Bandwidth(MBits/sec)"
+
+
+def runStage(stage, args):
+    """ runs one stage in this process and returns its rows and seconds.
+        args are the input and output paths of the stage (and the mode for log2csv).
+    """
+    if stage == "log2csv":
+        import log2csv
+        mode, logFile, output = args
+        start = time.perf_counter()
+        parser = log2csv.LogParser(logFile, output, logGenerators.MODE_ARGS.get(mode, {}))
+        getattr(parser, "parse_" + mode)()
+        parsed = time.perf_counter()
+        rows = len(next(iter(parser.data.values()), []))
+        parser.exportCsv()
+        end = time.perf_counter()
+        return {"rows": rows, "seconds": end - start, "parse_seconds": parsed - start}
+
+    if stage == "csvMerge":
+        import csvMerge
+        import tableIO
+        files, output = args[:-1], args[-1]
+        start = time.perf_counter()
+        frames = [tableIO.readTable(f, index_col='time', parse_dates=True) for f in files]
+        merged = csvMerge.mergeMany(frames, 'i')
+        tableIO.writeTable(merged, output, float_format='%.10f')
+        return {"rows": len(merged), "seconds": time.perf_counter() - start}
+
+    if stage in ("generateKML", "streamKML"):
+        import akmlGen
+        csvFile, output = args
+        start = time.perf_counter()
+        data = akmlGen.readCSV(csvFile, [KML_TARGET, akmlGen.LATITUDE_COL, akmlGen.LONGITUDE_COL, akmlGen.ALTITUDE_COL])
+        draw = akmlGen.generateKML if stage == "generateKML" else akmlGen.streamKML
+        draw(data, KML_TARGET, " ", None, None, output, "jet", 10, 1, None, [], [])
+        return {"rows": len(data), "seconds": time.perf_counter() - start}
+
+    if stage == "distance":
+        import improved_plot
+        csvFile, = args
+        start = time.perf_counter()
+        data = improved_plot.read_plot_data(csvFile, improved_plot.required_columns("time", KML_TARGET, "3d"))
+        for kind in ("start", "path", "3d"):
+            improved_plot.compute_distance(data, improved_plot.LON_COLUMN, improved_plot.LAT_COLUMN, kind=kind)
+        return {"rows": len(data), "seconds": time.perf_counter() - start}
+
+    raise ValueError(f"Unknown stage {stage}")
+
+
+def measure(stage, args):
+    """ runs a stage in a child process and returns its result with the wall time,
+        the peak resident memory of the child and whether it succeeded
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-stage", stage] + list(args)
+    start = time.perf_counter()
+    with tempfile.TemporaryFile("w+") as out:
+        proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT, text=True)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        out.seek(0)
+        lines = out.read().splitlines()
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    result = {"rows": None, "seconds": None}
+    if lines and lines[-1].startswith("{"):
+        result.update(json.loads(lines[-1]))
+    errors = [l for l in lines if l.startswith("Error") or "Traceback" in l]
+    result.update({"wall_seconds": wall, "peak_rss_mb": rss / 2**20,
+                   "ok": os.waitstatus_to_exitcode(status) == 0 and result["seconds"] is not None and not errors})
+    if not result["ok"]:
+        result["error"] = "\n".join(errors or lines[-5:])
+    return result
+
+
+def runInfo():
+    """ returns where the benchmark ran: versions, machine and git commit """
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"started": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "pandas": pandas.__version__, "numpy": numpy.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def runBenchmarks(sizes, modes, stages, workdir):
+    """ generates the logs of every size and mode in workdir and runs the stages on them.
+        Logs already in workdir are reused. Returns the result records.
+    """
+    downstream = [stage for stage in stages if stage != "log2csv"]
+    parseModes = list(modes) if "log2csv" in stages else []
+    parseModes += [mode for mode in MERGE_MODES if downstream and mode not in parseModes]
+    records = []
+    print(f"{'stage':<12} {'mode':<13} {'lines':>9} {'rows':>9} {'seconds':>9} {'lines/s':>10} {'rss MB':>8}")
+
+    def record(stage, mode, lines, result):
+        # throughput is in log lines, the rows of a stage depend on its mode (e.g. mgenRecv windows)
+        if result["ok"] and result["seconds"]:
+            result["lines_per_second"] = lines / result["seconds"]
+        records.append({"stage": stage, "mode": mode, "lines": lines, **result})
+        rate = f"{result['lines_per_second']:.0f}" if "lines_per_second" in result else "-"
+        seconds = f"{result['seconds']:.3f}" if result["seconds"] is not None else "failed"
+        print(f"{stage:<12} {mode or '':<13} {lines:>9} {result['rows'] or 0:>9} {seconds:>9} {rate:>10} {result['peak_rss_mb']:>8.0f}")
+        if not result["ok"]:
+            print("    " + result["error"].replace("\n", "\n    "))
+
+    for lines in sizes:
+        parsed = {}
+        for mode in parseModes:
+            logFile = os.path.join(workdir, f"{mode}_{lines}.txt")
+            if not os.path.exists(logFile):
+                logGenerators.writeLog(mode, lines, logFile)
+            parsed[mode] = os.path.join(workdir, f"{mode}_{lines}.csv")
+            result = measure("log2csv", [mode, logFile, parsed[mode]])
+            if mode in modes and "log2csv" in stages:
+                record("log2csv", mode, lines, result)
+
+        if not downstream:
+            continue
+        merged = os.path.join(workdir, f"merged_{lines}.csv")
+        inputs = [parsed[mode] for mode in MERGE_MODES]
+        result = measure("csvMerge", inputs + [merged])
+        if "csvMerge" in stages:
+            record("csvMerge", None, lines, result)
+        for stage in ("generateKML", "streamKML"):
+            if stage in stages:
+                record(stage, None, lines, measure(stage, [merged, os.path.join(workdir, f"{stage}_{lines}.kml")]))
+        if "distance" in stages:
+            record("distance", None, lines, measure("distance", [merged]))
+    return records
+
+
+def compareResults(previous, records):
+    """ prints the time and memory of records relative to the matching records of previous """
+    before = {(r["stage"], r["mode"], r["lines"]): r for r in previous["results"]}
+    print(f"\n{'stage':<12} {'mode':<13} {'lines':>9} {'seconds':>20} {'ratio':>7} {'rss MB':>16}")
+    for r in records:
+        old = before.get((r["stage"], r["mode"], r["lines"]))
+        if old is None or not old["ok"] or not r["ok"]:
+            continue
+        print(f"{r['stage']:<12} {r['mode'] or '':<13} {r['lines']:>9} {old['seconds']:>8.3f} -> {r['seconds']:<8.3f}"
+              f" {r['seconds'] / old['seconds']:>7.2f} {old['peak_rss_mb']:>6.0f} -> {r['peak_rss_mb']:<6.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark log2csv and the downstream tools on synthetic logs.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 100000],
+                        help='lines of the generated logs, e.g. 1000 to 10000000')
+    parser.add_argument('--modes', nargs='+', choices=list(logGenerators.GENERATORS), default=list(logGenerators.GENERATORS),
+                        help='log2csv modes to benchmark, default is all')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='stages to benchmark, default is all')
+    parser.add_argument('--workdir', default=None,
+                        help='directory of the generated logs and outputs, kept and reused between runs - '
+                             'default is a temporary directory')
+    parser.add_argument('--output', default="bench_results.json",
+                        help='JSON file of the results, default is %(default)s')
+    parser.add_argument('--compare', default=None,
+                        help='JSON results of an earlier run to compare with')
+    parser.add_argument('--run-stage', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        # child process of measure()
+        print(json.dumps(runStage(args.run_stage[0], args.run_stage[1:])))
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_pipeline_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        info = runInfo()
+        records = runBenchmarks(args.sizes, args.modes, args.stages, workdir)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir)
+
+    with open(args.output, "w") as f:
+        json.dump({"run": info, "results": records}, f, indent=1)
+    print(f"Results saved in {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compareResults(json.load(f), records)
+
+
+if __name__ == '__main__':
+    main()
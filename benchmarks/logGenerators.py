@@ -0,0 +1,321 @@
+""" Synthetic logs for the log2csv modes, at any number of lines, to benchmark the
+    pipeline on flight-sized data rather than the few hundred KB sample experiments.
+
+    Each generator writes lines shaped like the sample logs of its mode (prefix
+    timestamps, headers, units and the odd unparsable line included), from a fixed
+    seed so a size always gives the same log. Logs are written in chunks, so
+    10^7 lines need little memory.
+
+    usage: python benchmarks/logGenerators.py ue 1000000 ue.txt
+"""
+import argparse
+import csv
+import json
+import numpy as np
+
+BASE_TIME = np.datetime64("2026-01-20T17:44:20", "us")
+
+# Lines built and written at a time
+CHUNK_LINES = 100000
+
+LON, LAT, ALT = -78.6962748, 35.7273024, 30.0
+
+
+def chunks(lines):
+    """ yields (first line, line count) of the chunks of a log of lines lines """
+    for start in range(0, lines, CHUNK_LINES):
+        yield start, min(CHUNK_LINES, lines - start)
+
+
+def stamps(index, step, fmt="prefix"):
+    """ returns the times of line numbers index, step seconds apart from BASE_TIME,
+        as "[YYYY-MM-DD HH:MM:SS.ffffff]" prefixes, or as bare text with fmt="text"
+    """
+    times = BASE_TIME + (np.asarray(index) * step * 1e6).astype("timedelta64[us]")
+    text = np.char.replace(np.datetime_as_string(times, unit="us"), "T", " ")
+    return text.tolist() if fmt == "text" else ["[" + t + "]" for t in text.tolist()]
+
+
+def clockTimes(index, step):
+    """ returns the HH:MM:SS.ffffff time of day of line numbers index, like mgen prints it """
+    times = BASE_TIME + (np.asarray(index) * step * 1e6).astype("timedelta64[us]")
+    return [t[11:] for t in np.datetime_as_string(times, unit="us").tolist()]
+
+
+def withPrefix(value):
+    """ returns value as srsRAN prints it, with a k or M prefix """
+    if value >= 1e6:
+        return f"{value / 1e6:.1f}M"
+    if value >= 1e3:
+        return f"{value / 1e3:.1f}k"
+    return f"{value:.1f}"
+
+
+def ueLog(f, lines, rng):
+    # srsRAN UE metrics once a second, with the table header every 10 lines
+    f.write(f"{stamps([0], 1.0)[0]} Couldn't open , trying /root/.config/srsran/ue.conf\n")
+    for start, count in chunks(max(lines - 1, 0)):
+        index = np.arange(start, start + count)
+        prefix = stamps(index, 1.0)
+        rsrp = rng.integers(-110, -60, count)
+        snr = rng.uniform(0, 30, count)
+        brateDl = rng.uniform(0, 2e6, count)
+        brateUl = rng.uniform(0, 2e7, count)
+        buff = rng.uniform(0, 3e5, count)
+        out = []
+        for i in range(count):
+            if index[i] % 10 == 0:
+                out.append(f"{prefix[i]}  cc  pci  rsrp   pl   cfo | mcs  snr  iter  brate  bler  ta_us | mcs   buff  brate  bler\n")
+            elif index[i] % 97 == 1:
+                out.append(f"{prefix[i]} Random Access Complete.     c-rnti=0x46, ta=0\n")
+            else:
+                out.append(f"{prefix[i]}   0    1   {rsrp[i]}   {-rsrp[i]}  -1.9 |  {index[i] % 28}   {snr[i]:.0f}   1.0"
+                           f"   {withPrefix(brateDl[i])}    {index[i] % 5}%    0.0 |  19   {withPrefix(buff[i])}"
+                           f"   {withPrefix(brateUl[i])}    0%\n")
+        f.writelines(out)
+
+
+def enbLog(f, lines, rng):
+    # srsRAN eNB metrics of three UEs, with the table header every 20 lines
+    f.write(f"{stamps([0], 1.0)[0]} ---  Software Radio Systems LTE eNodeB  ---\n")
+    for start, count in chunks(max(lines - 1, 0)):
+        index = np.arange(start, start + count)
+        prefix = stamps(index, 1.0 / 3)
+        brateDl = rng.uniform(0, 1e6, count)
+        brateUl = rng.uniform(0, 1e7, count)
+        snr = rng.uniform(0, 30, count)
+        out = []
+        for i in range(count):
+            if index[i] % 20 == 0:
+                out.append(f"{prefix[i]} rnti  cqi  ri  mcs  brate   ok  nok  (%)  snr  phr  mcs  brate   ok  nok  (%)  bsr\n")
+            else:
+                out.append(f"{prefix[i]}   {0x46 + index[i] % 3:x}   15   1   27   {withPrefix(brateDl[i])}    {index[i] % 50}    0   0%"
+                           f"  {snr[i]:.1f}   {index[i] % 40}   20   {withPrefix(brateUl[i])}  {index[i] % 50}  0   0%"
+                           f"   {'n/a' if index[i] % 13 == 0 else withPrefix(brateUl[i] / 100)}\n")
+        f.writelines(out)
+
+
+EPC_MESSAGES = ["Received Attach Request", "Sending Authentication Request", "Received Authentication Response",
+                "UL NAS: Received Security Mode Complete", "Sending Create Session Request.", "Received GTP-C PDU. Message type: GTPC_MSG_TYPE_CREATE_SESSION_RESPONSE",
+                "SPGW: Allocated Ctrl TEID 1", "Received UE Context Release Request. MME-UE S1AP Id 1", ""]
+
+
+def epcLog(f, lines, rng):
+    f.write(f"{stamps([0], 1.0)[0]} ---  Software Radio Systems EPC  ---\n")
+    for start, count in chunks(max(lines - 1, 0)):
+        prefix = stamps(np.arange(start, start + count), 0.05)
+        choice = rng.integers(0, len(EPC_MESSAGES), count)
+        f.writelines([f"{prefix[i]} {EPC_MESSAGES[choice[i]]}\n" for i in range(count)])
+
+
+def pingLog(f, lines, rng):
+    # ping every 0.2 seconds, with a few timeouts that print no icmp_seq
+    for start, count in chunks(lines):
+        index = np.arange(start, start + count)
+        prefix = stamps(index, 0.2)
+        rtt = rng.gamma(2, 30, count)
+        out = []
+        for i in range(count):
+            if index[i] % 50 == 0:
+                out.append(f"{prefix[i]} Request timeout for icmp {index[i]}\n" if index[i] else f"{prefix[i]} PING 172.16.0.1 (172.16.0.1) 56(84) bytes of data.\n")
+            else:
+                out.append(f"{prefix[i]} 64 bytes from 172.16.0.1: icmp_seq={index[i]} ttl=64 time={rtt[i]:.1f} ms\n")
+        f.writelines(out)
+
+
+def iperfRate(rng, count):
+    # transfers and bitrates in the units iperf picks for them
+    transfer = rng.uniform(0, 4, count)
+    transfer[rng.random(count) < 0.03] = 0
+    kilo = transfer < 0.5
+    return transfer, kilo
+
+
+def iperfLog(f, lines, rng, client=True):
+    # two parallel streams reporting every second, then the summary
+    f.write(f"{stamps([0], 1.0)[0]} " + ("Connecting to host 172.16.0.1, port 5001\n" if client else "Server listening on 5001\n"))
+    f.write(f"{stamps([0], 1.0)[0]} [ ID] Interval           Transfer     Bitrate" + ("         Retr  Cwnd\n" if client else "\n"))
+    for start, count in chunks(max(lines - 4, 0)):
+        index = np.arange(start, start + count)
+        prefix = stamps(index // 2, 1.0)
+        transfer, kilo = iperfRate(rng, count)
+        retr = rng.poisson(0.5, count)
+        cwnd = rng.uniform(100, 900, count)
+        out = []
+        for i in range(count):
+            second = index[i] // 2
+            size = f"{transfer[i] * 1024:.0f} KBytes" if kilo[i] else f"{transfer[i]:.2f} MBytes"
+            rate = f"{transfer[i] * 8388:.0f} Kbits/sec" if kilo[i] else f"{transfer[i] * 8.39:.1f} Mbits/sec"
+            line = f"{prefix[i]} [  {5 + 2 * (index[i] % 2)}]  {second:>3}.00-{second + 1}.00   sec  {size}  {rate}"
+            out.append(line + (f"  {retr[i]:>3}    {cwnd[i]:.0f} KBytes       \n" if client else "                  \n"))
+        f.writelines(out)
+    seconds = max(lines - 4, 0) // 2
+    f.write(f"{stamps([seconds], 1.0)[0]} - - - - - - - - - - - - - - - - - - - - - - - - -\n")
+    f.write(f"{stamps([seconds], 1.0)[0]} [  5]   0.00-{seconds}.00  sec  1.00 GBytes  20.0 Mbits/sec  sender\n")
+
+
+def iperfClientLog(f, lines, rng):
+    iperfLog(f, lines, rng, client=True)
+
+
+def iperfServerLog(f, lines, rng):
+    iperfLog(f, lines, rng, client=False)
+
+
+def mgenLog(f, lines, rng):
+    # mgen receiver REPORT lines of two flows, about ten a second
+    f.write(f"{stamps([0], 0.1)[0]} {clockTimes([0], 0.1)[0]} START Mgen Version 5.1.1\n")
+    f.write(f"{stamps([0], 0.1)[0]} {clockTimes([0], 0.1)[0]} LISTEN proto>UDP port>5001\n")
+    for start, count in chunks(max(lines - 2, 0)):
+        index = np.arange(start, start + count)
+        prefix = stamps(index, 0.1)
+        clock = clockTimes(index, 0.1)
+        window = rng.uniform(0.09, 0.12, count)
+        rate = rng.uniform(0, 20000, count)
+        latency = rng.uniform(0.005, 0.05, count)
+        out = []
+        for i in range(count):
+            flow = 1 + index[i] % 2
+            out.append(f"{prefix[i]} {clock[i]} REPORT proto>UDP flow>{flow} src>172.16.0.10{flow}/45903 dst>172.16.0.1/500{flow}"
+                       f" window>{window[i]:.6f} rate>{rate[i]:.6f} kbps loss>0.000000 latency ave>{latency[i]:.6f}"
+                       f" min>{latency[i] / 2:.6f} max>{latency[i] * 2:.6f}, count>22\n")
+        f.writelines(out)
+
+
+def mgenRecvLog(f, lines, rng):
+    # per packet RECV lines of two flows at 1000 packets a second, with some packets lost
+    f.write(f"{stamps([0], 0.001)[0]} {clockTimes([0], 0.001)[0]} LISTEN proto>UDP port>5001\n")
+    for start, count in chunks(max(lines - 1, 0)):
+        index = np.arange(start, start + count)
+        prefix = stamps(index, 0.001)
+        clock = clockTimes(index, 0.001)
+        sent = clockTimes(index - rng.integers(5, 50, count), 0.001)
+        out = []
+        for i in range(count):
+            flow = 1 + index[i] % 2
+            seq = index[i] // 2 + index[i] // 1000 # a packet of each flow lost every second
+            out.append(f"{prefix[i]} {clock[i]} RECV proto>UDP flow>{flow} seq>{seq} src>172.16.0.10{flow}/45903"
+                       f" dst>172.16.0.1/500{flow} sent>{sent[i]} size>8192 gps>INVALID,999.000000,999.000000,4294966297 \n")
+        f.writelines(out)
+
+
+def vehicleOutLog(f, lines, rng):
+    # 1 Hz vehicle track: a random walk around the sample experiments' start point
+    lon, lat, alt, num = LON, LAT, ALT, 0
+    for start, count in chunks(lines):
+        times = stamps(np.arange(start, start + count), 1.0, fmt="text")
+        lons = lon + np.cumsum(rng.normal(0, 2e-5, count))
+        lats = lat + np.cumsum(rng.normal(0, 2e-5, count))
+        alts = np.abs(alt + np.cumsum(rng.normal(0, 0.2, count)))
+        attitude = rng.normal(0, 0.05, (count, 3))
+        velocity = rng.normal(0, 2, (count, 3))
+        out = []
+        for i in range(count):
+            num += 1
+            out.append(f'{num},{lons[i]:.7f},{lats[i]:.7f},{alts[i]:.3f},"({attitude[i, 0]},{attitude[i, 1]},{attitude[i, 2]})",'
+                       f'"({velocity[i, 0]:.2f},{velocity[i, 1]:.2f},{velocity[i, 2]:.2f})",48.383,{times[i]},4,29\n')
+        f.writelines(out)
+        lon, lat, alt = lons[-1], lats[-1], alts[-1]
+
+
+def pawprintsLog(f, lines, rng):
+    # PawPrints JSON lines every 37 ms, with up to six LTE cells and NR signal strength
+    epochMs = int((BASE_TIME - np.datetime64("1970-01-01T00:00:00", "us")) / np.timedelta64(1, "ms"))
+    for start, count in chunks(lines):
+        cellCounts = rng.integers(0, 7, count)
+        cellStart = np.concatenate(([0], np.cumsum(cellCounts)))
+        cells = cellStart[-1]
+        pci = rng.integers(0, 504, cells).tolist()
+        rsrp = rng.integers(-120, -60, cells).tolist()
+        rsrq = rng.integers(-20, -3, cells).tolist()
+        rssi = rng.integers(-90, -40, cells).tolist()
+        ssRsrp = rng.integers(-120, -60, count).tolist()
+        out = []
+        for i in range(count):
+            line = start + i
+            t = epochMs + line * 37
+            lineCells = [{"pci": str(pci[c]), "type": "LTE", "earfcn": 5230, "rsrp": rsrp[c], "rsrq": rsrq[c],
+                          "rssi": rssi[c], "ta": None} for c in range(cellStart[i], cellStart[i + 1])]
+            row = {"abs_time": t, "rel_time": line * 37, "connected_pci": int(lineCells[0]["pci"]) if lineCells else -1,
+                   "cells": lineCells}
+            if line % 3:
+                row["nr_signal_strength"] = {"ssRsrp": ssRsrp[i], "ssRsrq": -11, "ssSinr": 12.5, "csiRsrp": None}
+            if line % 5:
+                row["companion_abs_time"] = t + 3
+            out.append(json.dumps(row) + "\n")
+        f.writelines(out)
+
+
+NEMO_COLUMNS = ["Time", "Latitude", "Longitude", "Physical layer identity (LTE detected)", "RSRP", "RSRQ",
+                "PUSCH TX power", "Empty", "Event time"]
+
+
+def nemoLog(f, lines, rng):
+    # Nemo CSV export: a row every 0.25 s, measurements of 1 to 4 cells, uplink rows and a few bad ones.
+    # Parse it with --nemo-date, the times only have the time of day.
+    writer = csv.writer(f)
+    writer.writerow(NEMO_COLUMNS)
+    for start, count in chunks(max(lines - 1, 0)):
+        index = np.arange(start, start + count)
+        clock = [t[:12] for t in clockTimes(index, 0.25)]
+        kind = rng.random(count)
+        txPower = rng.uniform(-10, 23, count).round(1).tolist()
+        cellCounts = rng.integers(1, 5, count)
+        cellStart = np.concatenate(([0], np.cumsum(cellCounts)))
+        pci = rng.integers(0, 504, cellStart[-1]).astype(str).tolist()
+        rsrp = [f"{v:.2f}" for v in rng.uniform(-120, -70, cellStart[-1])]
+        rsrq = [f"{v:.1f}" for v in rng.uniform(-20, -3, cellStart[-1])]
+        rows = []
+        for i in range(count):
+            t, lat, lon = clock[i], LAT + index[i] * 1e-6, LON
+            if kind[i] < 0.05:
+                rows.append(["bad", lat, lon, "", "", "", "", "", ""])
+            elif kind[i] < 0.08:
+                rows.append([t, "", "", "", "", "", "", "", ""])
+            elif kind[i] < 0.3:
+                rows.append([t, lat, lon, "", "", "", txPower[i], "", t])
+            else:
+                cells = slice(cellStart[i], cellStart[i + 1])
+                rows.append([t, lat, lon, ",".join(pci[cells]), ",".join(rsrp[cells]),
+                             ",".join(rsrq[cells]) if kind[i] < 0.85 else "", "", "", ""])
+        writer.writerows(rows)
+
+
+# log2csv mode -> generator writing a log of that mode
+GENERATORS = {
+    "ue": ueLog,
+    "enb": enbLog,
+    "epc": epcLog,
+    "ping": pingLog,
+    "iperfClient": iperfClientLog,
+    "iperfServer": iperfServerLog,
+    "mgen": mgenLog,
+    "mgenRecv": mgenRecvLog,
+    "vehicleOut": vehicleOutLog,
+    "pawprints_4G": pawprintsLog,
+    "pawprints_5G": pawprintsLog,
+    "nemo": nemoLog
+}
+
+# log2csv modeArgs needed to parse the generated logs
+MODE_ARGS = {"nemo": {"nemo_date": "2026-01-20"}}
+
+
+def writeLog(mode, lines, path, seed=0):
+    """ writes a synthetic log of mode with about lines lines to path """
+    with open(path, "w", newline="") as f:
+        GENERATORS[mode](f, lines, np.random.default_rng(seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic log for a log2csv mode.')
+    parser.add_argument('mode', choices=list(GENERATORS))
+    parser.add_argument('lines', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    writeLog(args.mode, args.lines, args.output, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+""" Typed column storage for the rows of the log parsers (log2csv).
+
+    Parsed values kept as Python strings in lists cost about 50 to 80 bytes per cell,
+    and turn into object columns that every later stage has to parse again.
+    A column of a parser schema instead grows a typed array:
+     - float: array('d'), values that are not numbers are NaN
+     - int: array('q'), the column turns to float (NaN) at its first value that is not an integer
+     - time: array('q') of nanoseconds since the epoch (naive local time), missing times are NaT
+     - category: array('i') codes into the distinct values, e.g. rnti, iperf ID or ping destination
+     - str: a list of the text, for free text like the EPC log lines
+    Columns support append, extend, clear and len like the lists they replace,
+    series() returns the values as a pandas Series of the column type.
+"""
+import math
+from array import array
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# int64 value pandas reads as NaT
+NAT = np.iinfo(np.int64).min
+
+
+def toFloat(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def toNs(value):
+    """ returns a datetime, or its ISO text (e.g. "2026-01-19 15:38:26.646599"), as nanoseconds since the epoch """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return NAT
+    if value is None:
+        return NAT
+    return (value - EPOCH) // MICROSECOND * 1000
+
+
+class FloatColumn:
+    def __init__(self):
+        self._values = array('d')
+
+    def append(self, value):
+        try:
+            self._values.append(float(value))
+        except (TypeError, ValueError):
+            self._values.append(math.nan)
+
+    def extend(self, values):
+        if isinstance(values, np.ndarray) and values.dtype.kind in "fiub":
+            self._values.frombytes(values.astype(np.float64).tobytes())
+        else:
+            self._values.extend(map(toFloat, values))
+
+    def clear(self):
+        del self._values[:]
+
+    def __len__(self):
+        return len(self._values)
+
+    def series(self):
+        # copied, a view would keep the array from being cleared
+        return pd.Series(np.frombuffer(self._values, dtype=np.float64).copy())
+
+
+class IntColumn(FloatColumn):
+    def __init__(self):
+        self._values = array('q')
+
+    def _toFloat(self):
+        self._values = array('d', self._values)
+
+    def append(self, value):
+        if self._values.typecode == 'q':
+            try:
+                self._values.append(int(value))
+                return
+            except (TypeError, ValueError):
+                self._toFloat()
+        self._values.append(toFloat(value))
+
+    def extend(self, values):
+        if self._values.typecode == 'q':
+            if isinstance(values, np.ndarray) and values.dtype.kind in "iub":
+                self._values.frombytes(values.astype(np.int64).tobytes())
+                return
+            if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+                self._toFloat()
+                FloatColumn.extend(self, values)
+                return
+            values = list(values)
+            try:
+                self._values.extend([int(v) for v in values])
+                return
+            except (TypeError, ValueError):
+                self._toFloat()
+        FloatColumn.extend(self, values)
+
+    def series(self):
+        dtype = np.int64 if self._values.typecode == 'q' else np.float64
+        return pd.Series(np.frombuffer(self._values, dtype=dtype).copy())
+
+
+class TimeColumn(FloatColumn):
+    def __init__(self):
+        self._values = array('q')
+
+    def append(self, value):
+        self._values.append(toNs(value))
+
+    def extend(self, values):
+        if isinstance(values, (np.ndarray, pd.Series)) and values.dtype.kind == "M":
+            self._values.frombytes(np.asarray(values, dtype="datetime64[ns]").view(np.int64).tobytes())
+        else:
+            self._values.extend(map(toNs, values))
+
+    def series(self):
+        return pd.Series(np.frombuffer(self._values, dtype=np.int64).copy().view("datetime64[ns]"))
+
+
+class CategoryColumn:
+    def __init__(self):
+        self._codes = array('i')
+        self._index = {} # value -> code
+        self._categories = []
+
+    def _code(self, value):
+        if value is None:
+            return -1
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self._categories)
+            self._categories.append(value)
+        return code
+
+    def append(self, value):
+        self._codes.append(self._code(value))
+
+    def extend(self, values):
+        self._codes.extend(map(self._code, values))
+
+    def clear(self):
+        # the categories are kept, so the codes of later rows stay the same
+        del self._codes[:]
+
+    def __len__(self):
+        return len(self._codes)
+
+    def series(self):
+        codes = np.frombuffer(self._codes, dtype=np.int32).copy()
+        return pd.Series(pd.Categorical.from_codes(codes, categories=list(self._categories)))
+
+
+class TextColumn:
+    def __init__(self):
+        self._values = []
+
+    def append(self, value):
+        self._values.append(value)
+
+    def extend(self, values):
+        self._values.extend(values)
+
+    def clear(self):
+        self._values.clear()
+
+    def __len__(self):
+        return len(self._values)
+
+    def series(self):
+        return pd.Series(self._values)
+
+
+COLUMN_TYPES = {
+    "float": FloatColumn,
+    "int": IntColumn,
+    "time": TimeColumn,
+    "category": CategoryColumn,
+    "str": TextColumn
+}
+
+
+def makeColumns(schema):
+    """ returns an empty column per entry of schema, a dict of column name to kind (see COLUMN_TYPES) """
+    return {name: COLUMN_TYPES[kind]() for name, kind in schema.items()}
+
+
+def toFrame(data):
+    """ returns data, a dict of columns from makeColumns (or arrays and Series), as a DataFrame.
+        Raises ValueError when the columns have different lengths, like DataFrame.from_dict of lists.
+    """
+    if len({len(col) for col in data.values()}) > 1:
+        raise ValueError("All arrays must be of the same length")
+    return pd.DataFrame({name: col.series() if hasattr(col, "series") else col for name, col in data.items()})
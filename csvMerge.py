@@ -1,6 +1,10 @@
 import argparse
+import os
 import sys
+import numpy as np
 import pandas as pd
+import tableIO
+import runStats
 
 def trimTS(df, ts_min, ts_max):
     """ trims rows from DataFrame that are not within ts_min and ts_max
@@ -9,11 +13,7 @@ def trimTS(df, ts_min, ts_max):
             ts_min - minimum timestamp to keep
             ts_max - maximum timestamp to keep
     """
-    for i in df.index:
-        if i < ts_min or i > ts_max:
-            df = df.drop(i)
-
-    return df
+    return df[(df.index >= ts_min) & (df.index <= ts_max)]
 
 def filterTS(df, ts):
     """ trims rows from DataFrame with timestamps that are not in ts
@@ -23,55 +23,288 @@ def filterTS(df, ts):
         Returns:
             trimmed DataFrame
     """
-    for i in df.index:
-        if i not in ts:
-            df = df.drop(i)
-
-    return df
-
-parser = argparse.ArgumentParser(description='Merge csv.')
-parser.add_argument('file1', nargs=1, type=argparse.FileType('r'),
-                    help='first file to be merged')
-parser.add_argument('file2', nargs=1, type=argparse.FileType('r'),
-                    help='second file to be merged')
-parser.add_argument('--output', nargs='?', type=argparse.FileType('w'), default=sys.stdout,
-                    help='output file for merged csv, default is standart output (screen)')
-parser.add_argument('--format', nargs='?', choices=['c','i'], default='i',
-                    help='specifies format of data merged from file2 as copy (c) or interpolate (i), default is interpolate')
-parser.add_argument('--no-trim', action='store_true')
-
-args = vars(parser.parse_args())
-
-file1_df = pd.read_csv(args['file1'][0],index_col='time', parse_dates=True)
-file2_df = pd.read_csv(args['file2'][0], index_col='time', parse_dates=True)
-
-
-# Calculate overlapping timestamp interval [ts_min, ts_max]
-ts1_min, ts1_max = file1_df.index[0], file1_df.index[-1]
-ts2_min, ts2_max = file2_df.index[0], file2_df.index[-1]
-ts_min = max(ts1_min, ts2_min)
-ts_max = min(ts1_max, ts2_max)
-
-ts = file1_df.index
-
-mergedDf = (
-    pd.concat([file1_df, file2_df])
-      .sort_values(by='time')
-)
-
-if args['format'] == 'i':
-    # Performs interpolate on only the numeric columns to avoid exception by .interpolate()
-    numeric_cols = mergedDf.select_dtypes(exclude=['object']).columns
-    mergedDf[numeric_cols] = mergedDf[numeric_cols].interpolate(method='time')
-else:
-    # Fills in NaN values using last valid value in column
-    mergedDf = mergedDf.ffill()
-
-# If --no-trim was specified, don't trim dataframe
-if not args['no_trim']:
-   mergedDf = trimTS(mergedDf, ts_min, ts_max)
-# Only keeps timestamps that are in file1
-mergedDf = filterTS(mergedDf, ts)
-
-print(mergedDf.head(5))
-mergedDf.to_csv(path_or_buf=args['output'], float_format='%.10f')
+    return df[df.index.isin(ts)]
+
+def sortedByTime(df):
+    """ returns df sorted on its time index, without copying if it already is """
+    return df if df.index.is_monotonic_increasing else df.sort_index(kind='stable')
+
+def interpolateAt(ts, df, tolerance=None):
+    """ linearly interpolates the columns of df at the timestamps ts
+        Parameters:
+            ts - sorted DatetimeIndex to interpolate at
+            df - DataFrame of numeric columns indexed by sorted time
+            tolerance - Timedelta, timestamps farther than this from any sample of df get NaN
+        Returns:
+            DataFrame indexed by ts
+    """
+    x = ts.as_unit('ns').asi8
+    xp = df.index.as_unit('ns').asi8
+    # Offsets from a common origin, epoch nanoseconds lose sub-microsecond precision as floats
+    origin = xp[0] if len(xp) else 0
+    x, xp = x - origin, xp - origin
+    out = pd.DataFrame(index=ts)
+    for col in df.columns:
+        valid = df[col].notna().to_numpy()
+        if not valid.any():
+            out[col] = np.nan
+            continue
+        # NaN before the first sample, last value after the last one, as interpolate(method='time') does
+        out[col] = np.interp(x, xp[valid], df[col].to_numpy(dtype=float)[valid], left=np.nan)
+
+    if tolerance is not None and len(xp):
+        right = np.searchsorted(xp, x).clip(1, len(xp) - 1) if len(xp) > 1 else np.zeros(len(x), dtype=int)
+        left = right - 1 if len(xp) > 1 else right
+        gap = np.minimum(np.abs(x - xp[left]), np.abs(xp[right] - x))
+        out[gap > pd.Timedelta(tolerance).value] = np.nan
+    return out
+
+def alignAsof(file1_df, file2_df, format='i', direction='nearest', tolerance=None):
+    """ aligns the columns of file2_df on the timestamps of file1_df, in a single
+        pass over both sorted frames instead of sorting and filling their union
+        Parameters:
+            file1_df - DataFrame indexed by time, its timestamps are kept
+            file2_df - DataFrame indexed by time, merged into file1_df
+            format - copy (c) the value found by the as-of join, or linearly
+                     interpolate (i) the numeric columns at the file1 timestamps
+            direction - as-of join direction: nearest, backward or forward
+            tolerance - Timedelta, maximum distance to the matched file2 sample
+        Returns:
+            file1_df sorted by time, with the file2_df columns added
+    """
+    file1_df = sortedByTime(file1_df)
+    file2_df = sortedByTime(file2_df)
+    tolerance = pd.Timedelta(tolerance) if tolerance is not None else None
+
+    interpCols = []
+    if format == 'i':
+        interpCols = list(file2_df.select_dtypes(include='number').columns)
+    joinCols = [col for col in file2_df.columns if col not in interpCols]
+
+    aligned = interpolateAt(file1_df.index, file2_df[interpCols], tolerance)
+    if joinCols:
+        joined = pd.merge_asof(file1_df[[]], file2_df[joinCols], left_index=True, right_index=True,
+                               direction=direction, tolerance=tolerance)
+        for col in joinCols:
+            aligned[col] = joined[col].to_numpy()
+
+    mergedDf = file1_df.copy()
+    for col in file2_df.columns:
+        if col in mergedDf.columns:
+            # Columns present in both files keep the file1 values where there are some
+            mergedDf[col] = mergedDf[col].fillna(aligned[col])
+        else:
+            mergedDf[col] = aligned[col]
+    return mergedDf
+
+def mergeFrames(file1_df, file2_df, format='i', trim=True, align='concat', direction='nearest', tolerance=None,
+                stats=None):
+    """ merges the columns of file2_df into the timestamps of file1_df
+        Parameters:
+            file1_df - DataFrame indexed by time, its timestamps are kept
+            file2_df - DataFrame indexed by time, merged into file1_df
+            format - copy (c) or interpolate (i) the values of file2_df
+            trim - drop the rows outside the interval covered by both frames
+            align - concat sorts and fills the union of both frames, asof
+                    aligns file2_df directly on the file1 timestamps (see alignAsof)
+            direction - as-of join direction, asof alignment only
+            tolerance - maximum distance to a file2 sample, asof alignment only
+            stats - runStats.RunStats timing the concat, interpolate and trim phases, or None
+        Returns:
+            merged DataFrame
+    """
+    # Calculate overlapping timestamp interval [ts_min, ts_max]
+    ts1_min, ts1_max = file1_df.index.min(), file1_df.index.max()
+    ts2_min, ts2_max = file2_df.index.min(), file2_df.index.max()
+    ts_min = max(ts1_min, ts2_min)
+    ts_max = min(ts1_max, ts2_max)
+
+    if align != 'asof':
+        return mergeUnion([file1_df, file2_df], [format], trim, stats)
+
+    with runStats.phase(stats, "interpolate"):
+        mergedDf = alignAsof(file1_df, file2_df, format, direction, tolerance)
+    if trim:
+        with runStats.phase(stats, "trim"):
+            mergedDf = trimTS(mergedDf, ts_min, ts_max)
+    _countTrimmed(stats, file1_df, mergedDf)
+    return mergedDf
+
+def mergeUnion(frames, formats, trim=True, stats=None):
+    """ merges frames onto the timestamps of the first one in a single pass: the union of
+        all frames is sorted once, then the columns of each frame are filled over it
+        Parameters:
+            frames - DataFrames indexed by time, the first one is the reference timeline
+            formats - copy (c) or interpolate (i), one per frame after the first. The columns of
+                      the first frame follow the first format, and a column found in several
+                      frames the format of the first of them
+            trim - drop the rows outside the interval covered by all frames
+            stats - runStats.RunStats timing the concat, interpolate and trim phases, or None
+        Returns:
+            merged DataFrame
+    """
+    # Calculate overlapping timestamp interval [ts_min, ts_max]
+    ts_min = max(df.index.min() for df in frames)
+    ts_max = min(df.index.max() for df in frames)
+    ts = frames[0].index
+
+    with runStats.phase(stats, "concat"):
+        mergedDf = (
+            pd.concat(frames)
+              .sort_values(by='time')
+        )
+
+    columnFormats = {}
+    for df, format in zip(frames, [formats[0]] + list(formats)):
+        for col in df.columns:
+            columnFormats.setdefault(col, format)
+
+    with runStats.phase(stats, "interpolate"):
+        # Performs interpolate on only the numeric columns to avoid exception by .interpolate()
+        numeric_cols = set(mergedDf.select_dtypes(include='number').columns)
+        interpolated = [col for col, format in columnFormats.items() if format == 'i' and col in numeric_cols]
+        copied = [col for col, format in columnFormats.items() if format == 'c']
+        if interpolated:
+            mergedDf[interpolated] = mergedDf[interpolated].interpolate(method='time')
+        if copied:
+            # Fills in NaN values using last valid value in column
+            mergedDf[copied] = mergedDf[copied].ffill()
+
+    with runStats.phase(stats, "trim"):
+        # If --no-trim was specified, don't trim dataframe
+        if trim:
+            mergedDf = trimTS(mergedDf, ts_min, ts_max)
+        # Only keeps timestamps that are in the first frame
+        mergedDf = filterTS(mergedDf, ts)
+    _countTrimmed(stats, frames[0], mergedDf)
+    return mergedDf
+
+def _countTrimmed(stats, file1_df, mergedDf):
+    """ counts the rows of file1_df left out of mergedDf in stats, when there are stats """
+    if stats is not None:
+        stats.skip("outside the time range of another file", len(file1_df) - len(mergedDf))
+
+def mergeMany(frames, formats='i', trim=True, align='concat', direction='nearest', tolerance=None, prefixes=None,
+              stats=None):
+    """ merges any number of frames onto the timestamps of the first one
+        Parameters:
+            frames - DataFrames indexed by time, the first one is the reference timeline
+            formats - copy (c) or interpolate (i), one for all frames or one per frame after the first
+            trim - drop the rows outside the interval covered by all frames
+            align - concat merges all frames in one pass (see mergeUnion), asof aligns
+                    each frame in turn on the reference timeline (see alignAsof)
+            direction, tolerance - as-of join options, see mergeFrames
+            prefixes - optional column prefix per frame, '' leaves the columns of a frame as they are
+            stats - runStats.RunStats timing the phases of every merge, or None
+        Returns:
+            merged DataFrame
+    """
+    if prefixes:
+        if len(prefixes) != len(frames):
+            raise ValueError("Expected one prefix per input, got " + str(len(prefixes)) + " for " + str(len(frames)) + " inputs")
+        frames = [df.add_prefix(prefix) if prefix else df for df, prefix in zip(frames, prefixes)]
+    if isinstance(formats, str):
+        formats = [formats]
+    if len(formats) == 1:
+        formats = formats * (len(frames) - 1)
+    if len(formats) != len(frames) - 1:
+        raise ValueError("Expected one format for all inputs or one per input after the first")
+
+    if align != 'asof':
+        return mergeUnion(frames, formats, trim, stats)
+
+    # As-of joins never sort a union, every input is aligned on the reference timeline in turn
+    mergedDf = frames[0]
+    for df, format in zip(frames[1:], formats):
+        mergedDf = mergeFrames(mergedDf, df, format, trim, align, direction, tolerance, stats)
+    return mergedDf
+
+def formatList(value):
+    """ parses the --format value: c or i, or several of them separated by commas """
+    formats = value.split(',')
+    if any(format not in ('c', 'i') for format in formats):
+        raise argparse.ArgumentTypeError("expected c or i, or a comma separated list of them, got " + repr(value))
+    return formats
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Merge csv.')
+    parser.add_argument('files', nargs='+',
+                        help='files to be merged (CSV, Parquet or Feather), the timestamps of the first one are kept')
+    parser.add_argument('--output', nargs='?', default=sys.stdout,
+                        help='output file for merged csv, default is standart output (screen)')
+    parser.add_argument('--output-format', choices=tableIO.FORMATS, default=None,
+                        help='format of the output, default is from the output extension, else csv')
+    parser.add_argument('--format', type=formatList, default=['i'],
+                        help='specifies format of data merged from the other files as copy (c) or interpolate (i), '
+                             'either once for all files or once per file after the first separated by commas '
+                             '(e.g. i,c), default is interpolate')
+    parser.add_argument('--prefix', type=lambda value: value.split(','), default=None,
+                        help='column prefixes of the files separated by commas, in file order, '
+                             'an empty one keeps the names of a file (e.g. radio_,,gps_)')
+    parser.add_argument('--no-trim', action='store_true')
+    parser.add_argument('--align', choices=['concat','asof'], default='concat',
+                        help='concat sorts and fills the union of the files, asof matches the other files directly '
+                             'on the timestamps of the first (faster on large files), default is concat')
+    parser.add_argument('--direction', choices=['nearest','backward','forward'], default='nearest',
+                        help='which sample of the other files is copied with --align asof, default is nearest')
+    parser.add_argument('--tolerance', type=pd.Timedelta, default=None,
+                        help='maximum distance to a sample of the other files with --align asof, e.g. 500ms')
+    parser.add_argument('--stats', '--profile', action='store_true',
+                        help='report the time of the load, concat, interpolate, trim and write phases, the rows read '
+                             '(as lines) and written, the rows dropped by trimming and the peak memory')
+    parser.add_argument('--stats-format', choices=runStats.REPORT_FORMATS, default='table',
+                        help='--stats report as a table for reading or as JSON, default is %(default)s')
+    parser.add_argument('--stats-file', type=str, default=None,
+                        help='file the --stats report is appended to, default is standard error')
+
+    args = vars(parser.parse_args())
+    if len(args['files']) < 2:
+        parser.error('at least two files are needed')
+    if len(args['format']) not in (1, len(args['files']) - 1):
+        parser.error('--format takes one value, or one per file after the first')
+    if args['prefix'] is not None and len(args['prefix']) != len(args['files']):
+        parser.error('--prefix takes one value per file')
+    return args
+
+def readFrames(files, stats=None):
+    """ reads the tables to merge, indexed by their time column
+        Parameters:
+            files - CSV, Parquet or Feather files
+            stats - runStats.RunStats counting the rows (as lines) and bytes read in a load phase, or None
+        Returns:
+            list of DataFrames
+    """
+    frames = []
+    for f in files:
+        with runStats.phase(stats, "load"):
+            frames.append(tableIO.readTable(f, index_col='time', parse_dates=True))
+        if stats is not None:
+            stats.lines += len(frames[-1])
+            stats.bytes += os.path.getsize(f)
+    return frames
+
+def main():
+    args = parseArgs()
+    stats = runStats.RunStats("csvMerge", ", ".join(args['files'])) if args['stats'] else None
+
+    try:
+        frames = readFrames(args['files'], stats)
+
+        mergedDf = mergeMany(frames, args['format'], not args['no_trim'],
+                             args['align'], args['direction'], args['tolerance'], args['prefix'], stats)
+
+        print(mergedDf.head(5))
+        with runStats.phase(stats, "write"):
+            tableIO.writeTable(mergedDf, args['output'], args['output_format'], float_format='%.10f')
+        if stats is not None:
+            stats.rows = len(mergedDf)
+    except Exception as e:
+        if stats is not None:
+            stats.error(e)
+        raise
+    finally:
+        if stats is not None:
+            stats.report(args['stats_format'], args['stats_file'])
+
+if __name__ == '__main__':
+    main()
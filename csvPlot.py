@@ -1,46 +1,32 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import sys
-import numpy as np
 import argparse
+import tableIO
+from geoDistance import haversine, distanceFromStart # haversine stays importable from csvPlot
+from plotReduce import reduceForPlot, DOWNSAMPLE_METHODS, MAX_POINTS
 
-def haversine(lon1, lat1, lon2, lat2):
-    """
-    Calculate the great circle distance in kilometers between two points
-    on the Earth (specified in decimal degrees).
-    """
-    # Convert decimal degrees to radians
-    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
-
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
-    c = 2 * np.arcsin(np.sqrt(a))
-    r = 6371  # Radius of Earth in kilometers. Use 3956 for miles. Determines return value units.
-    return c * r
-
-def plot_scatter(csv_file, x_column, y_column, y1_color='b', y2_color='r'):
-    # Read the CSV file
-    data = pd.read_csv(csv_file)
-
+def plot_scatter(csv_file, x_column, y_column, y1_color='b', y2_color='r', downsample=None, max_points=MAX_POINTS, aggregate=None):
     lon_column = "Longitude"
     lat_column = "Latitude"
 
+    # Read the CSV file (or Parquet/Feather), loading only the plotted columns
+    data = tableIO.readTable(csv_file, columns=[x_column, y_column, lon_column, lat_column])
+
     # Check if the columns exist in the CSV
     if x_column not in data.columns or y_column not in data.columns or lon_column not in data.columns or lat_column not in data.columns:
         print(f"Columns '{x_column}', '{y_column}', '{lon_column}', or '{lat_column}' not found in the CSV file.")
         return
 
-    # Define starting position
-    start_lon = data[lon_column].iloc[0]
-    start_lat = data[lat_column].iloc[0]
-
     # Calculate distances from the starting position
-    data['distance'] = data.apply(lambda row: haversine(start_lon, start_lat, row[lon_column], row[lat_column]) * 100, axis=1)
+    data['distance'] = distanceFromStart(data[lon_column], data[lat_column]) * 100
+
+    # Aggregate and/or downsample long series, see plotReduce
+    data = reduceForPlot(data, x_column, [y_column, 'distance'], downsample, max_points, aggregate)
 
     # Plot the graph
     plt.figure(figsize=(10, 6))
+    if aggregate:
+        plt.fill_between(data[x_column], data[y_column + '_p5'], data[y_column + '_p95'], color=y1_color, alpha=0.2, label=f'{y_column} p5-p95')
     plt.scatter(data[x_column], data[y_column], color=y1_color, label=y_column, s=0.8)
     plt.scatter(data[x_column], data['distance'], color=y2_color, label='distance', s=0.8)
     plt.xlabel(x_column)
@@ -49,27 +35,28 @@ def plot_scatter(csv_file, x_column, y_column, y1_color='b', y2_color='r'):
     plt.legend()
     plt.show()
 
-def plot_line(csv_file, x_column, y_column, y1_color='b', y2_color='r'):
-    # Read the CSV file
-    data = pd.read_csv(csv_file)
-
+def plot_line(csv_file, x_column, y_column, y1_color='b', y2_color='r', downsample=None, max_points=MAX_POINTS, aggregate=None):
     lon_column = "Longitude"
     lat_column = "Latitude"
 
+    # Read the CSV file (or Parquet/Feather), loading only the plotted columns
+    data = tableIO.readTable(csv_file, columns=[x_column, y_column, lon_column, lat_column])
+
     # Check if the columns exist in the CSV
     if x_column not in data.columns or y_column not in data.columns or lon_column not in data.columns or lat_column not in data.columns:
         print(f"Columns '{x_column}', '{y_column}', '{lon_column}', or '{lat_column}' not found in the CSV file.")
         return
 
-    # Define starting position
-    start_lon = data[lon_column].iloc[0]
-    start_lat = data[lat_column].iloc[0]
-
     # Calculate distances from the starting position
-    data['distance'] = data.apply(lambda row: (haversine(start_lon, start_lat, row[lon_column], row[lat_column]) * 100 - 35) * -1, axis=1)
+    data['distance'] = (distanceFromStart(data[lon_column], data[lat_column]) * 100 - 35) * -1
+
+    # Aggregate and/or downsample long series, see plotReduce
+    data = reduceForPlot(data, x_column, [y_column, 'distance'], downsample, max_points, aggregate)
 
     # Plot the graph
     plt.figure(figsize=(10, 6))
+    if aggregate:
+        plt.fill_between(data[x_column], data[y_column + '_p5'], data[y_column + '_p95'], color=y1_color, alpha=0.2, label=f'{y_column} p5-p95')
     plt.plot(data[x_column], data[y_column], color=y1_color, label=y_column)
     plt.plot(data[x_column], data['distance'], color=y2_color, label='distance')
     plt.xlabel(x_column)
@@ -94,14 +81,22 @@ if __name__ == "__main__":
 
     parser.add_argument('--y2_color', default='r',
                         help='y axis color')
+    parser.add_argument('--downsample', choices=DOWNSAMPLE_METHODS, default=None,
+                        help='plot about --max_points rows: min/max per x bucket, or LTTB')
+    parser.add_argument('--max_points', type=int, default=MAX_POINTS,
+                        help='rows kept per series with --downsample')
+    parser.add_argument('--aggregate', type=float, default=None,
+                        help='plot the mean (and 5th-95th percentile band) of y over buckets of this many seconds')
     
 
 
     args = parser.parse_args()
 
     if args.graph_type == "scatter":
-        plot_scatter(args.logfile, args.x_axis, args.y_axis, y1_color=args.y1_color, y2_color=args.y2_color)
+        plot_scatter(args.logfile, args.x_axis, args.y_axis, y1_color=args.y1_color, y2_color=args.y2_color,
+                     downsample=args.downsample, max_points=args.max_points, aggregate=args.aggregate)
     elif args.graph_type == "line":
-        plot_line(args.logfile, args.x_axis, args.y_axis, y1_color=args.y1_color, y2_color=args.y2_color)
+        plot_line(args.logfile, args.x_axis, args.y_axis, y1_color=args.y1_color, y2_color=args.y2_color,
+                  downsample=args.downsample, max_points=args.max_points, aggregate=args.aggregate)
     else:
         raise ValueError("Invalid graph type")
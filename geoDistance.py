@@ -0,0 +1,86 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Use 3956 for miles. Determines return value units.
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Calculate the great circle distance in kilometers between two points
+    on the Earth (specified in decimal degrees). Works element-wise on arrays.
+    """
+    # Convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
+
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+def distanceFromStart(lon, lat):
+    """
+    Great circle distance in kilometers of every point of a track from its first point.
+    lon, lat - longitude and latitude columns (Series or arrays) in decimal degrees
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if len(lon) == 0:
+        return np.zeros(0)
+    return haversine(lon[0], lat[0], lon, lat)
+
+def pathLength(lon, lat):
+    """
+    Cumulative distance in kilometers travelled along a track, 0 at its first point.
+    Segments with a missing coordinate count as 0.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if len(lon) == 0:
+        return np.zeros(0)
+    segments = np.nan_to_num(haversine(lon[:-1], lat[:-1], lon[1:], lat[1:]))
+    return np.concatenate(([0.], np.cumsum(segments)))
+
+def distance3dFromStart(lon, lat, alt):
+    """
+    Straight-line distance in kilometers of every point of a track from its first point,
+    combining the great circle distance with the altitude difference (alt in meters).
+    """
+    alt = np.asarray(alt, dtype=float)
+    ground = distanceFromStart(lon, lat)
+    if len(alt) == 0:
+        return ground
+    return np.sqrt(ground**2 + ((alt - alt[0]) / 1000.)**2)
+
+def simplifyTrack(lon, lat, tolerance):
+    """
+    Douglas-Peucker simplification of a track: returns a mask of the points to keep so that
+    no dropped point is further than tolerance meters from the simplified path.
+    Uses a local flat projection around the first point, fine for tracks of a few km.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    n = len(lon)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    metersPerDegree = np.radians(1) * EARTH_RADIUS_KM * 1000
+    x = (lon - lon[0]) * metersPerDegree * np.cos(np.radians(lat[0]))
+    y = (lat - lat[0]) * metersPerDegree
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        norm = np.hypot(dx, dy)
+        dist = np.hypot(px, py) if norm == 0 else np.abs(dx * py - dy * px) / norm
+        farthest = int(np.argmax(dist))
+        if dist[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
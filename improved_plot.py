@@ -1,89 +1,79 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
 import argparse
-
-def haversine(lon1, lat1, lon2, lat2):
-    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = np.sin(dlat / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2
-    c = 2 * np.arcsin(np.sqrt(a))
-    r = 6371
-    return c * r
-
-def compute_distance(data, lon_column, lat_column, invert=False):
-    start_lon = data[lon_column].iloc[0]
-    start_lat = data[lat_column].iloc[0]
-
-    distance = data.apply(
-        lambda row: haversine(start_lon, start_lat,
-                              row[lon_column], row[lat_column]) * 100,
-        axis=1
-    )
+import tableIO
+from geoDistance import distanceFromStart, pathLength, distance3dFromStart
+from plotReduce import reduceForPlot, DOWNSAMPLE_METHODS, MAX_POINTS
+
+def compute_distance(data, lon_column, lat_column, invert=False, kind="start", alt_column="Altitude"):
+    """
+    kind: "start" - distance from the first point, "path" - cumulative path length,
+          "3d" - distance from the first point including the altitude change
+    """
+    if kind == "path":
+        distance = pathLength(data[lon_column], data[lat_column]) * 100
+    elif kind == "3d":
+        distance = distance3dFromStart(data[lon_column], data[lat_column], data[alt_column]) * 100
+    else:
+        distance = distanceFromStart(data[lon_column], data[lat_column]) * 100
 
     if invert:
         distance *= -1
 
     return distance
 
-def plot_scatter(csv_file, x_column, y_column, y1_color='b', y2_color='r', invert_distance=False):
-    data = pd.read_csv(csv_file)
-
-    lon_column = "Longitude"
-    lat_column = "Latitude"
-
-    required = {x_column, y_column, lon_column, lat_column}
+LON_COLUMN = "Longitude"
+LAT_COLUMN = "Latitude"
+ALT_COLUMN = "Altitude"
+
+def required_columns(x_column, y_column, distance_kind='start'):
+    required = {x_column, y_column, LON_COLUMN, LAT_COLUMN}
+    if distance_kind == "3d":
+        required.add(ALT_COLUMN)
+    return required
+
+def read_plot_data(csv_file, columns):
+    # Only the plotted columns are loaded, which is cheap for Parquet and Feather files
+    return tableIO.readTable(csv_file, columns=list(columns))
+
+def render_plot(data, x_column, y_column, graph_type='scatter', y1_color='b', y2_color='r', invert_distance=False,
+                distance_kind='start', downsample=None, max_points=MAX_POINTS, aggregate=None):
+    """
+    Draws y_column (left axis) and the distance (right axis) against x_column from the
+    loaded data and returns the figure, or None when columns are missing.
+    graph_type: scatter or line
+    """
+    required = required_columns(x_column, y_column, distance_kind)
     if not required.issubset(data.columns):
         print(f"Missing required columns: {required - set(data.columns)}")
-        return
-
-    data['distance'] = compute_distance(
-        data, lon_column, lat_column, invert=invert_distance
-    )
-
-    fig, ax1 = plt.subplots(figsize=(10, 6))
-    ax2 = ax1.twinx()
-
-    ax1.scatter(data[x_column], data[y_column],
-                color=y1_color, s=0.8, label=y_column)
-    ax2.scatter(data[x_column], data['distance'],
-                color=y2_color, s=0.8, label='distance')
-
-    ax1.set_xlabel(x_column)
-    ax1.set_ylabel(y_column, color=y1_color)
-    ax2.set_ylabel("distance", color=y2_color)
+        return None
 
-    ax1.tick_params(axis='y', labelcolor=y1_color)
-    ax2.tick_params(axis='y', labelcolor=y2_color)
-
-    fig.suptitle(f"{y_column} (left) and distance (right) vs {x_column}")
-
-    fig.tight_layout()
-    plt.show()
-
-def plot_line(csv_file, x_column, y_column, y1_color='b', y2_color='r', invert_distance=False):
-    data = pd.read_csv(csv_file)
+    data = data.assign(distance=compute_distance(
+        data, LON_COLUMN, LAT_COLUMN, invert=invert_distance, kind=distance_kind
+    ))
 
-    lon_column = "Longitude"
-    lat_column = "Latitude"
-
-    required = {x_column, y_column, lon_column, lat_column}
-    if not required.issubset(data.columns):
-        print(f"Missing required columns: {required - set(data.columns)}")
-        return
-
-    data['distance'] = compute_distance(
-        data, lon_column, lat_column, invert=invert_distance
-    )
+    # Aggregate and/or downsample long series, see plotReduce
+    data = reduceForPlot(data, x_column, [y_column, 'distance'], downsample, max_points, aggregate)
 
     fig, ax1 = plt.subplots(figsize=(10, 6))
     ax2 = ax1.twinx()
 
-    ax1.plot(data[x_column], data[y_column],
-             color=y1_color, label=y_column)
-    ax2.plot(data[x_column], data['distance'],
-             color=y2_color, label='distance')
+    if aggregate:
+        ax1.fill_between(data[x_column], data[y_column + '_p5'], data[y_column + '_p95'],
+                         color=y1_color, alpha=0.2, label=f'{y_column} p5-p95')
+
+    if graph_type == "scatter":
+        ax1.scatter(data[x_column], data[y_column],
+                    color=y1_color, s=0.8, label=y_column)
+        ax2.scatter(data[x_column], data['distance'],
+                    color=y2_color, s=0.8, label='distance')
+    elif graph_type == "line":
+        ax1.plot(data[x_column], data[y_column],
+                 color=y1_color, label=y_column)
+        ax2.plot(data[x_column], data['distance'],
+                 color=y2_color, label='distance')
+    else:
+        plt.close(fig)
+        raise ValueError("Invalid graph type (use scatter or line)")
 
     ax1.set_xlabel(x_column)
     ax1.set_ylabel(y_column, color=y1_color)
@@ -95,7 +85,23 @@ def plot_line(csv_file, x_column, y_column, y1_color='b', y2_color='r', invert_d
     fig.suptitle(f"{y_column} (left) and distance (right) vs {x_column}")
 
     fig.tight_layout()
-    plt.show()
+    return fig
+
+def plot_scatter(csv_file, x_column, y_column, y1_color='b', y2_color='r', invert_distance=False, distance_kind='start',
+                 downsample=None, max_points=MAX_POINTS, aggregate=None):
+    data = read_plot_data(csv_file, required_columns(x_column, y_column, distance_kind))
+    fig = render_plot(data, x_column, y_column, 'scatter', y1_color, y2_color, invert_distance,
+                      distance_kind, downsample, max_points, aggregate)
+    if fig is not None:
+        plt.show()
+
+def plot_line(csv_file, x_column, y_column, y1_color='b', y2_color='r', invert_distance=False, distance_kind='start',
+              downsample=None, max_points=MAX_POINTS, aggregate=None):
+    data = read_plot_data(csv_file, required_columns(x_column, y_column, distance_kind))
+    fig = render_plot(data, x_column, y_column, 'line', y1_color, y2_color, invert_distance,
+                      distance_kind, downsample, max_points, aggregate)
+    if fig is not None:
+        plt.show()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Plot CSV data with Matplotlib.')
@@ -109,6 +115,15 @@ if __name__ == "__main__":
 
     parser.add_argument('--invert-distance', action='store_true',
                         help='Invert the distance plot')
+    parser.add_argument('--distance', choices=['start', 'path', '3d'], default='start',
+                        help='distance from the start point, cumulative path length, '
+                             'or distance from the start point including altitude')
+    parser.add_argument('--downsample', choices=DOWNSAMPLE_METHODS, default=None,
+                        help='plot about --max-points rows per series: min/max per x bucket, or LTTB')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS,
+                        help='rows kept per series with --downsample')
+    parser.add_argument('--aggregate', type=float, default=None,
+                        help='plot the mean (and 5th-95th percentile band) of y over buckets of this many seconds')
 
     args = parser.parse_args()
 
@@ -117,14 +132,22 @@ if __name__ == "__main__":
             args.logfile, args.x_axis, args.y_axis,
             y1_color=args.y1_color,
             y2_color=args.y2_color,
-            invert_distance=args.invert_distance
+            invert_distance=args.invert_distance,
+            distance_kind=args.distance,
+            downsample=args.downsample,
+            max_points=args.max_points,
+            aggregate=args.aggregate
         )
     elif args.graph_type == "line":
         plot_line(
             args.logfile, args.x_axis, args.y_axis,
             y1_color=args.y1_color,
             y2_color=args.y2_color,
-            invert_distance=args.invert_distance
+            invert_distance=args.invert_distance,
+            distance_kind=args.distance,
+            downsample=args.downsample,
+            max_points=args.max_points,
+            aggregate=args.aggregate
         )
     else:
         raise ValueError("Invalid graph type (use scatter or line)")
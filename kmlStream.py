@@ -0,0 +1,143 @@
+""" Writes KML documents placemark by placemark, straight to a file.
+
+    simplekml keeps every feature and its inline style as objects and serializes the
+    whole tree on save. KmlWriter writes each placemark as it is given, and styles are
+    written once at the top of the document and referenced by styleUrl.
+    Paths ending in .kmz are written as a zipped doc.kml.
+
+    Regions and NetworkLinks let a viewer load parts of a large document only
+    when they are on screen and big enough, see akmlGen --lod.
+"""
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+KML_NAMESPACES = 'xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2"'
+
+
+def coordinates(points, precision=7):
+    """ returns the KML coordinates text of (lon, lat, alt) rows,
+        precision is the number of decimals of lon and lat (7 is about 1 cm)
+    """
+    fmt = f"%.{precision}f,%.{precision}f,%.3f"
+    return " ".join([fmt % tuple(point) for point in points])
+
+
+def kmlColor(rgb, alpha=255):
+    """ returns the KML (aabbggrr) color of integer (r, g, b) """
+    r, g, b = rgb
+    return f"{alpha:02x}{b:02x}{g:02x}{r:02x}"
+
+
+def region(north, south, east, west, minLodPixels=0, maxLodPixels=-1):
+    """ returns the KML text of a Region, active while its box covers between
+        minLodPixels and maxLodPixels (-1 is no limit) on screen
+    """
+    return (f"<Region><LatLonAltBox><north>{north}</north><south>{south}</south>"
+            f"<east>{east}</east><west>{west}</west></LatLonAltBox>"
+            f"<Lod><minLodPixels>{minLodPixels}</minLodPixels><maxLodPixels>{maxLodPixels}</maxLodPixels></Lod></Region>")
+
+
+def _text(tag, value):
+    return f"<{tag}>{escape(str(value))}</{tag}>"
+
+
+class KmlWriter:
+    """ streams a KML document to path, .kmz paths are zipped.
+        With archive (an open zipfile.ZipFile), the document is written to the
+        path entry of the archive instead, e.g. the tiles linked from a doc.kml.
+        Usage:
+            with KmlWriter("track.kmz", name="track") as kml:
+                kml.style("c0", "ff0000ff", lineWidth=10)
+                kml.polygon(ring, "#c0", name="1.5")
+    """
+    def __init__(self, path, name=None, archive=None):
+        self.path = str(path)
+        self._zip = None
+        if archive is not None:
+            self._file = io.TextIOWrapper(archive.open(self.path, "w"), encoding="utf-8")
+        elif self.path.lower().endswith(".kmz"):
+            self._zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+            self._file = io.TextIOWrapper(self._zip.open("doc.kml", "w"), encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+        self._folders = 0
+        self._file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<kml {KML_NAMESPACES}><Document>')
+        if name is not None:
+            self._file.write(_text("name", name))
+
+    def style(self, styleId, color, lineWidth=None, labelVisibility=True):
+        """ writes a style used by both polygons (fill color) and line strings """
+        line = f"<color>{color}</color>"
+        if lineWidth is not None:
+            line += f"<width>{lineWidth}</width>"
+        if labelVisibility:
+            line += "<gx:labelVisibility>1</gx:labelVisibility>"
+        self._file.write(f'<Style id="{escape(styleId)}"><LineStyle>{line}</LineStyle>'
+                         f'<PolyStyle><color>{color}</color></PolyStyle></Style>')
+
+    def openFolder(self, name, visible=True, region=None):
+        """ starts a folder, region is the text of a Region from region() """
+        self._file.write("<Folder>" + _text("name", name))
+        if not visible:
+            self._file.write("<visibility>0</visibility>")
+        if region is not None:
+            self._file.write(region)
+        self._folders += 1
+
+    def closeFolder(self):
+        if self._folders:
+            self._file.write("</Folder>")
+            self._folders -= 1
+
+    def networkLink(self, name, href, region=None):
+        """ writes a link to the KML document at href (relative to this one), loaded
+            when region (the text of a Region from region()) becomes active
+        """
+        self._file.write("<NetworkLink>" + _text("name", name) + (region or "") +
+                         "<Link>" + _text("href", href) + "<viewRefreshMode>onRegion</viewRefreshMode></Link></NetworkLink>")
+
+    def _placemark(self, geometry, styleUrl, name, description):
+        buf = ["<Placemark>"]
+        if name is not None:
+            buf.append(_text("name", name))
+        if description is not None:
+            buf.append(_text("description", description))
+        if styleUrl is not None:
+            buf.append(f"<styleUrl>{styleUrl}</styleUrl>")
+        buf.append(geometry)
+        buf.append("</Placemark>")
+        self._file.write("".join(buf))
+
+    def polygon(self, ring, styleUrl=None, name=None, description=None, altitudeMode="relativeToGround"):
+        """ writes a polygon placemark, ring is its coordinates text or (lon, lat, alt) rows """
+        if not isinstance(ring, str):
+            ring = coordinates(ring)
+        self._placemark(f"<Polygon><altitudeMode>{altitudeMode}</altitudeMode><outerBoundaryIs><LinearRing>"
+                        f"<coordinates>{ring}</coordinates></LinearRing></outerBoundaryIs></Polygon>",
+                        styleUrl, name, description)
+
+    def lineString(self, coords, styleUrl=None, name=None, description=None, altitudeMode="relativeToGround"):
+        """ writes a line string placemark, coords is its coordinates text or (lon, lat, alt) rows """
+        if not isinstance(coords, str):
+            coords = coordinates(coords)
+        self._placemark(f"<LineString><altitudeMode>{altitudeMode}</altitudeMode>"
+                        f"<coordinates>{coords}</coordinates></LineString>",
+                        styleUrl, name, description)
+
+    def close(self):
+        if self._file is None:
+            return
+        while self._folders:
+            self.closeFolder()
+        self._file.write("</Document></kml>\n")
+        self._file.close()
+        self._file = None
+        if self._zip is not None:
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
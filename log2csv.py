@@ -2,86 +2,368 @@
 import argparse
 import sys
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from array import array
+from datetime import datetime, timedelta
 import json
-import math
+import itertools
+import re
+import os
+import io
+import contextlib
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+import threading
+import mmap
+import tableIO
+import columnStore
+import runStats
+
+try:
+    import orjson # optional, decodes the PawPrints JSON lines several times faster
+    jsonLoads = orjson.loads
+except ImportError:
+    jsonLoads = json.loads
 
 
 def parseArgs():
     parser = argparse.ArgumentParser(description='Generate CSV from log file.')
-    parser.add_argument('logfile', type=str,
-                        help='Log file for CSV')
+    parser.add_argument('logfile', type=str, nargs='+',
+                        help='Log file for CSV, or experiment directories with --batch')
 
-    parser.add_argument('-m','--mode', choices=['ue','enb','epc','ping','iperfClient','iperfServer','cellSearch','vehicleLog','vehicleOut','channelSounder','gnuradioOfdm', 'pawprints_4G', 'pawprints_5G', 'nemo', 'mgen'],
+    parser.add_argument('-m','--mode', choices=['ue','enb','epc','ping','iperfClient','iperfServer','cellSearch','vehicleLog','vehicleOut','channelSounder','gnuradioOfdm', 'pawprints_4G', 'pawprints_5G', 'nemo', 'mgen', 'mgenRecv'],
     
-                        help='Mode for parsing')
+                        help='Mode for parsing, default is detected from the start of the log')
     parser.add_argument('-o','--output', type=str, default=sys.stdout,
                         help='output file for csv, default is ')
     
+    parser.add_argument('--output-format', choices=tableIO.FORMATS, default=None,
+                        help='format of the output table, default is from the output extension, else csv. '
+                             'parquet and feather keep the column types and need pyarrow')
+
     parser.add_argument('--nemo-date', type=str, default=None,
                         help='Date at which the nemo log was recorded, in YYYY-MM-DD format')
 
-
-    return parser.parse_args()
-
-
-def fixPrefixes(value: str): # fixes the SI prefixes (e.g., k = 10^3)
-    if 'm' in value: # milli
-        value=value.replace("m","") # get it out
-        valFloat=float(value)*0.001 # make it float and milli
-        return str(valFloat)
-    if 'k' in value: # kilo
-        value=value.replace("k","") # get it out
-        valFloat=float(value)*1000. # make it float and kilo
-        return str(valFloat)
-    if 'M' in value: # Mega
-        value=value.replace("M","") # get it out
-        valFloat=float(value)*1000000. # make it float and mega
-        return str(valFloat)
-    if '%' in value: # percentages
-        value=value.replace("%","") # get it out
-        valFloat=float(value)*0.01 # make it float and percent
-        return str(valFloat)
-    return(value)
+    parser.add_argument('--window', type=float, default=None,
+                        help='seconds over which mgenRecv summarizes each flow, default is %s, '
+                             '0 writes one row per packet' % MGEN_WINDOW)
+
+    parser.add_argument('--stream', action='store_true',
+                        help='parse the log line by line and write the CSV in chunks, keeping memory use flat')
+    parser.add_argument('--chunk-rows', type=int, default=STREAM_CHUNK_ROWS,
+                        help='rows buffered before each chunk is written in --stream mode, default is %(default)s')
+
+    parser.add_argument('--batch', action='store_true',
+                        help='parse every known log of the given experiment directories into their parsed_csvs/')
+    parser.add_argument('-j','--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes used by --batch, default is the number of cores')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='re-parse every log in --batch mode, even those unchanged since the last run')
+
+    parser.add_argument('--follow', action='store_true',
+                        help='keep parsing the logs as they grow until interrupted (Ctrl-C), '
+                             'several logs are written to <output directory or log directory>/<log name>.csv')
+    parser.add_argument('--flush-interval', type=float, default=FOLLOW_FLUSH_INTERVAL,
+                        help='longest time in seconds parsed rows wait before they are written in --follow mode, '
+                             'default is %(default)s')
+
+    parser.add_argument('--stats', '--profile', action='store_true',
+                        help='report the time of each parsing phase, lines, bytes and rows per second, skipped lines, '
+                             'errors and peak memory')
+    parser.add_argument('--stats-format', choices=runStats.REPORT_FORMATS, default='table',
+                        help='--stats report as a table for reading or as JSON, default is %(default)s')
+    parser.add_argument('--stats-file', type=str, default=None,
+                        help='file the --stats report is appended to, default is standard error')
+
+    args = parser.parse_args()
+    if not args.batch and not args.follow and len(args.logfile) > 1:
+        parser.error('only one log file can be parsed at a time, use --batch for experiment directories '
+                     'or --follow for running logs')
+    if args.follow and args.batch:
+        parser.error('--follow and --batch cannot be used together')
+    if args.batch and (args.mode or isinstance(args.output, str)):
+        parser.error('-m/--mode and -o/--output cannot be used with --batch, the mode of each log comes from its name '
+                     'or content and the outputs go into the parsed_csvs/ of its experiment')
+    if args.stats and args.batch:
+        parser.error('--stats is not available with --batch, the logs are parsed in other processes')
+    if args.follow and len(args.logfile) == 1 and not isinstance(args.output, str):
+        parser.error('--follow needs an output file, given with -o')
+    return args
+
+
+# SI prefixes (e.g., k = 10^3) and percentages of the srsRAN metric values
+SI_PREFIXES = {"u": 0.000001, "m": 0.001, "k": 1000., "M": 1000000., "%": 0.01}
+
+def scalePrefixes(values: pd.Series): # scales the values of a whole column by their SI_PREFIXES suffix, returns floats
+    suffix = values.str[-1]
+    hasPrefix = suffix.isin(SI_PREFIXES.keys())
+    numbers = pd.to_numeric(values.where(~hasPrefix, values.str[:-1]), errors="coerce")
+    return numbers * suffix.map(SI_PREFIXES).where(hasPrefix, 1.)
+
+# Column types of the srsRAN metric tables, in the order they are printed.
+# "int" columns fall back to float for a batch that has unparsable values (e.g. n/a)
+UE_METRIC_COLUMNS = {
+    "cc": "int",
+    "pci": "int",
+    "rsrp": "float",
+    "pl": "float",
+    "cfo": "float",
+    "mcsDl": "float",
+    "snr": "float",
+    "turbo": "float",
+    "brateDl": "float",
+    "blerDl": "float",
+    "ta_us": "float",
+    "mcsUl": "float",
+    "buff": "float",
+    "brateUl": "float",
+    "blerUl": "float"
+}
+
+ENB_METRIC_COLUMNS = {
+    "rnti": "category",
+    "cqi": "float",
+    "ri": "float",
+    "mcsDl": "float",
+    "brateDl": "float",
+    "okDl": "float",
+    "nokDl": "float",
+    "(%)Dl": "float",
+    "snr": "float",
+    "phr": "float",
+    "mcsUl": "float",
+    "brateUl": "float",
+    "okUl": "float",
+    "nokUl": "float",
+    "(%)Ul": "float",
+    "bsr": "float"
+}
+
+# Metric lines converted together by the vectorized srsRAN parsers
+METRIC_BATCH_ROWS = 4096
+
+# Columns of the rows of each line parser, stored in self.data as typed columnStore columns.
+# "int" columns turn to float at their first value that is not an integer, "category" columns
+# keep a code per row into their distinct values, "str" columns keep the text.
+MODE_COLUMNS = {
+    "cellSearch": {"time": "time", "Freq": "float", "EARFCN": "int", "PHYID": "int", "PRB": "int",
+                   "Ports": "int", "PSS": "float", "PSR": "float"},
+    "ue": {"time": "time", **UE_METRIC_COLUMNS},
+    "enb": {"time": "time", **ENB_METRIC_COLUMNS},
+    "epc": {"time": "time", "log": "str"},
+    "ping": {"time": "time", "size(byte)": "int", "destination": "category", "icmp_seq": "int",
+             "ttl": "int", "pingtime": "float"},
+    "iperfServer": {"time": "time", "ID": "category", "Interval(sec)": "str",
+                    "Transfer(MBytes)": "float", "Bandwidth(MBits/sec)": "float"},
+    "iperfClient": {"time": "time", "ID": "category", "Interval(sec)": "str",
+                    "Transfer(MBytes)": "float", "Bandwidth(MBits/sec)": "float", "Retr": "int",
+                    "Cwnd(KBytes)": "float"},
+    "mgen": {"time": "time", "Interval(sec)": "float", "Latency(sec)": "float", "Bandwidth(MBits/sec)": "float"},
+    "vehicleLog": {"time": "time", "log": "str"},
+    "vehicleOut": {"num": "int", "Longitude": "float", "Latitude": "float", "Altitude": "float",
+                   "Pitch": "float", "Yaw": "float", "Roll": "float", "VelocityX": "float",
+                   "VelocityY": "float", "VelocityZ": "float", "BatteryVolts": "float", "time": "time",
+                   "GPSFix": "int", "NumberOfSatellites": "int"},
+    "channelSounder": {"time": "time", "Measurement No": "int", "Power in dB": "float"},
+    "gnuradioOfdm": {"time": "time", "Offset": "int", "Source": "category", "Key": "category", "Value": "str"}
+}
+
+# Factors normalizing the iperf units: bit rates are decimal, byte counts binary (iperf KBytes are 1024 bytes)
+BANDWIDTH_TO_MBITS = {"bits/sec": 1e-6, "Kbits/sec": 1e-3, "Mbits/sec": 1., "Gbits/sec": 1e3}
+TRANSFER_TO_MBYTES = {"Bytes": 1. / 1024**2, "KBytes": 1. / 1024, "MBytes": 1., "GBytes": 1024.}
+CWND_TO_KBYTES = {"Bytes": 1. / 1024, "KBytes": 1., "MBytes": 1024., "GBytes": 1024.**2}
 
 def normalize_bandwidth_to_mbits(value_str, unit):
-    val = float(value_str)
+    # values of unknown units are kept as they are
+    return float(value_str) * BANDWIDTH_TO_MBITS.get(unit, 1.)
+
+def normalizeUnits(values, units, factors): # vectorized unit normalization of byte string fields
+    factor = pd.Series(units).map({unit.encode(): f for unit, f in factors.items()}).fillna(1.)
+    return np.array(values).astype(float) * factor.to_numpy()
+
+# Interval lines of iperf3 clients and servers, e.g. (client only from Retr on, UDP servers add jitter and loss)
+# "[2026-01-19 14:42:33.238393] [  5]   0.00-1.00   sec  3.39 MBytes  28.4 Mbits/sec    0    180 KBytes"
+# Groups: timestamp, ID, interval, transfer, unit, bandwidth, unit, retr, cwnd, unit
+IPERF_INTERVAL = re.compile(
+    rb"^\[([^\]\n]*)\] *\[ *([^\]\n]*?) *\] +(\d+\.\d+-\d+\.\d+) +sec +(\d+(?:\.\d+)?) +([KMG]?Bytes)"
+    rb" +(\d+(?:\.\d+)?) +([KMG]?bits/sec)(?: +(\d+) +(\d+(?:\.\d+)?) +([KMG]?Bytes))?", re.M)
+
+def decodeFields(values): # byte string fields (without newlines) as str, decoded all at once
+    return b"\n".join(values).decode("utf-8", errors="replace").split("\n")
+
+# Line before the summary iperf prints at the end of a test, nothing after it is parsed
+IPERF_SUMMARY = b"- - - - - - - -"
+
+# Bytes of an iperf log scanned at once by the memory-mapped tokenizer
+IPERF_BLOCK_BYTES = 1 << 20
+
+
+# key>value fields of mgen event lines, e.g. "flow>1 seq>780 sent>22:44:35.795164 size>8192"
+MGEN_FIELD = re.compile(r"(\w+)>(\S+)")
+
+# Default window of the per flow mgenRecv statistics, in seconds
+MGEN_WINDOW = 1.0
+
+SECONDS_PER_DAY = 86400
+
+def timeOfDayNs(values): # "HH:MM:SS.f" strings (1 to 9 fraction digits) as int64 nanoseconds since midnight
+    text = np.array(values, dtype=str)
+    width = text.dtype.itemsize // 4
+    if len(text) == 0 or not 10 <= width <= 18 or (np.char.str_len(text) != width).any():
+        # not all in one fixed width layout (mgen writes microseconds), let pandas parse them
+        return pd.to_timedelta(pd.Series(values)).to_numpy(dtype="timedelta64[ns]").astype(np.int64)
+    digits = text.view(np.uint32).reshape(-1, width).astype(np.int64) - ord("0")
+    seconds = (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 3] * 10 + digits[:, 4]) * 60 + digits[:, 6] * 10 + digits[:, 7]
+    fraction = digits[:, 9:width] @ (10 ** np.arange(width - 10, -1, -1))
+    return seconds * 10**9 + fraction * 10**(18 - width)
+
+# Local UTC offsets are looked up once per step of this many seconds, time zones change offset on quarter hours
+LOCAL_OFFSET_STEP = 900
+
+def epochMsToLocal(values): # epoch milliseconds as naive local datetime64[ns], like datetime.fromtimestamp
+    ms = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    local = np.full(len(ms), np.datetime64("NaT"), dtype="datetime64[ns]")
+    valid = ~np.isnan(ms)
+    micros = np.round(ms[valid] * 1000).astype(np.int64)
+    steps, inverse = np.unique(micros // (LOCAL_OFFSET_STEP * 10**6), return_inverse=True)
+    offsets = np.array([time.localtime(int(step) * LOCAL_OFFSET_STEP).tm_gmtoff for step in steps], dtype=np.int64)
+    local[valid] = ((micros + offsets[inverse] * 10**6) * 1000).view("datetime64[ns]")
+    return local
+
+def localToEpochMs(values): # naive local datetimes as epoch milliseconds, like datetime.timestamp() * 1000
+    naive = pd.Series(values).to_numpy(dtype="datetime64[ns]").astype(np.int64) // 1000
+    steps, inverse = np.unique(naive // (LOCAL_OFFSET_STEP * 10**6), return_inverse=True)
+    epoch = datetime(1970, 1, 1)
+    offsets = np.array([int(step) * LOCAL_OFFSET_STEP - (epoch + timedelta(seconds=int(step) * LOCAL_OFFSET_STEP)).timestamp()
+                        for step in steps], dtype=np.int64)
+    return (naive - offsets[inverse] * 10**6) / 1000.
+
+# Time of day of the Time column of Nemo exports, the times strptime takes as "%H:%M:%S.%f"
+NEMO_TIME = r"(?:[01]?\d|2[0-3]):[0-5]?\d:[0-5]?\d\.\d{1,6}"
+
 
-    if unit == "bits/sec":
-        return val / 1e6
-    elif unit == "Kbits/sec":
-        return val / 1e3
-    elif unit == "Mbits/sec":
-        return val
-    else:
-        return val
+# Fixed-width "[YYYY-MM-DD HH:MM:SS.ffffff]" prefix written in front of every log line
+TIMESTAMP_PREFIX = re.compile(r"\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{6}\]", re.ASCII)
 
+def parseTimestamp(line: str): # decodes the bracketed timestamp at the start of a log line
+    if TIMESTAMP_PREFIX.match(line):
+        # fromisoformat on the fixed-width slice is several times faster than strptime
+        return datetime.fromisoformat(line[1:27])
+    # Prefixes that are not fixed width (e.g. fewer microsecond digits) take the slow path
+    return datetime.strptime(line.split("]")[0].split("[")[1], "%Y-%m-%d %H:%M:%S.%f")
 
 
+# Number of parsed rows buffered in memory before a chunk is written in streaming mode
+STREAM_CHUNK_ROWS = 10000
+
+# Bytes of JSON lines decoded together by the PawPrints parsers
+JSON_BATCH_BYTES = 1 << 20
+
+# Seconds between two checks of a followed log for new lines
+FOLLOW_POLL_INTERVAL = 0.5
+
+# Longest time parsed rows of a followed log wait before they are written, in seconds
+FOLLOW_FLUSH_INTERVAL = 2.0
+
+# Timestamp layout used when writing chunks, matches what pandas emits for a whole log
+STREAM_DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
 
 class LogParser:
-    def __init__(self, logFile, outputFname, modeArgs):
+    def __init__(self, logFile, outputFname, modeArgs, outputFormat=None, stats=None):
         self.outputFname = outputFname
+        self.outputFormat = outputFormat # csv, parquet or feather, default is from the output extension
         self.logFile = logFile
         self.modeArgs = modeArgs
-        with open(logFile) as f:
-            self.raw = f.readlines()
         self.data = {}
+        self.offset = 0 # bytes of the log consumed so far in follow mode
+        self._follow = None # threading.Event ending follow mode, None reads the log once
+        self._onIdle = None # called whenever a followed log has no new complete line
+        self._pending = None # drains rows an iter_* parser batches before adding them to self.data
+        self.stats = stats # runStats.RunStats filled in while parsing, None keeps no statistics
+        self.errors = [] # exceptions the parsers and writers printed instead of raising
+        self._parseTimestamp = parseTimestamp if stats is None else stats.timed("timestamps", parseTimestamp)
+
+    def _lines(self, skip=0):
+        # Iterates over the log one line at a time instead of reading it into memory
+        self._skip("header", skip)
+        if self._follow is not None:
+            yield from itertools.islice(self._counted(self._followLines()), skip, None)
+            return
+        with open(self.logFile) as f:
+            try:
+                yield from itertools.islice(self._counted(f), skip, None)
+            finally:
+                if self.stats is not None:
+                    self.stats.bytes += f.buffer.tell()
+
+    def _counted(self, lines):
+        # Lines counted and their reading timed, with statistics
+        return lines if self.stats is None else self.stats.reading(lines)
+
+    def _skip(self, reason, count=1):
+        # Counts log lines (or rows) that give no row, with statistics
+        if self.stats is not None:
+            self.stats.skip(reason, count)
+
+    def _recordError(self, e):
+        # Keeps the error a parser prints instead of raising, so callers can tell a partial output
+        self.errors.append(e)
+        if self.stats is not None:
+            self.stats.error(e)
+
+    def _followLines(self):
+        # Yields the complete lines of the log as they are appended, until self._follow is set.
+        # A line still being written is kept until its newline arrives (or follow mode ends).
+        while not os.path.exists(self.logFile):
+            if self._follow.wait(FOLLOW_POLL_INTERVAL):
+                return
+        partial = b""
+        with open(self.logFile, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                line = f.readline()
+                if line:
+                    self.offset += len(line)
+                    if self.stats is not None:
+                        self.stats.bytes += len(line)
+                    if line.endswith(b"\n"):
+                        yield (partial + line).decode("utf-8", errors="replace")
+                        partial = b""
+                    else:
+                        partial += line
+                    continue
+                if os.path.getsize(self.logFile) < self.offset:
+                    print("Log " + self.logFile + " was truncated, following it from the start")
+                    f.seek(0)
+                    self.offset = 0
+                    partial = b""
+                    continue
+                if self._onIdle is not None:
+                    self._onIdle()
+                if self._follow.wait(FOLLOW_POLL_INTERVAL):
+                    break
+        if partial:
+            yield partial.decode("utf-8", errors="replace")
+
+    def _drain(self, rows):
+        # Runs an iter_* parser to the end, keeping every row in self.data
+        for _ in rows:
+            pass
+
+    def _bufferedRows(self):
+        return len(next(iter(self.data.values()), []))
 
     def parse_cellSearch(self):
-        self.data = {
-            "time":[],
-            "Freq": [],
-            "EARFCN":[],
-            "PHYID": [],
-            "PRB":[],
-            "Ports":[],
-            "PSS":[],
-            "PSR":[]
-        }
+        self._drain(self.iter_cellSearch())
+
+    def iter_cellSearch(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["cellSearch"])
         try:
-            for l in self.raw[1:]:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines(1):
+                ts = self._parseTimestamp(l)
                 dt = (" ".join(l.split("]")[1:])).split(",")
 
                 self.data["time"].append(ts)
@@ -92,111 +374,120 @@ class LogParser:
                 self.data["Ports"].append(dt[dt.index("  ports")+1])
                 self.data["PSS"].append(dt[dt.index(" PSS power dB")+1])
                 self.data["PSR"].append(dt[dt.index("  PSR")+1])
+                yield
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing cell search log file: ", e)
 
     def parse_ue(self):
-        self.data = {
-            "time":[],
-            "cc": [],
-            "pci":[],
-            "rsrp": [],
-            "pl":[],
-            "cfo":[],
-            "mcsDl":[],
-            "snr":[],
-            "turbo":[],
-            "brateDl":[],
-            "blerDl":[],
-            "ta_us":[],
-            "mcsUl":[],
-            "buff":[],
-            "brateUl":[],
-            "blerUl":[]
-        }
+        self._drain(self.iter_ue())
+
+    def iter_ue(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["ue"])
+        times, rows = [], []
+        self._pending = lambda: self._appendMetricRows(times, rows, UE_METRIC_COLUMNS)
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1], "%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 l = l.replace("|","")
-                dt = l.split("]")[1][:-1].split(" ")
+                dt = l.split("]")[1][:-1].split()
 
-                dt = [i for i in dt if '' != i]
-                # print(str(len(dt))+"..."+l)
                 if len(dt) == 15 and dt[0] != "cc" and dt[0] != "Current":
-                    self.data["time"].append(ts)
-                    for index, j in enumerate(dt):
-                        j = fixPrefixes(j)
-                        self.data[list(self.data.keys())[index+1]].append(j)
+                    times.append(ts)
+                    rows.append(dt)
+                    if len(rows) >= METRIC_BATCH_ROWS:
+                        self._appendMetricRows(times, rows, UE_METRIC_COLUMNS)
+                        yield
+                else:
+                    self._skip("not a metric line")
+            self._appendMetricRows(times, rows, UE_METRIC_COLUMNS)
+            yield
 
         except Exception as e:
+            self._recordError(e)
+            # Keep the lines parsed before the error, like the line-by-line parsers do
+            self._appendMetricRows(times, rows, UE_METRIC_COLUMNS)
             print("Error parsing UE log file: ", e)
 
     def parse_enb(self):
-        self.data = {
-            "time":[],
-            "rnti":[],
-            "cqi":[],
-            "ri":[],
-            "mcsDl":[],
-            "brateDl":[],
-            "okDl":[],
-            "nokDl":[],
-            "(%)Dl":[],
-            "snr":[],
-            "phr":[],
-            "mcsUl":[],
-            "brateUl":[],
-            "okUl":[],
-            "nokUl":[],
-            "(%)Ul":[],
-            "bsr":[]
-        }
+        self._drain(self.iter_enb())
+
+    def iter_enb(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["enb"])
         ## Multi User case??
+        times, rows = [], []
+        self._pending = lambda: self._appendMetricRows(times, rows, ENB_METRIC_COLUMNS)
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
-                dt = l.split("]")[1][:-1].split(" ")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
+                dt = l.split("]")[1][:-1].split()
 
-                dt = [i for i in dt if '' != i]
                 if len(dt) == 16 and dt[0] != "rnti":
-                    self.data["time"].append(ts)
-                    for index, j in enumerate(dt):
-                        self.data[list(self.data.keys())[index+1]].append(j)
+                    times.append(ts)
+                    rows.append(dt)
+                    if len(rows) >= METRIC_BATCH_ROWS:
+                        self._appendMetricRows(times, rows, ENB_METRIC_COLUMNS)
+                        yield
+                else:
+                    self._skip("not a metric line")
+            self._appendMetricRows(times, rows, ENB_METRIC_COLUMNS)
+            yield
 
         except Exception as e:
+            self._recordError(e)
+            self._appendMetricRows(times, rows, ENB_METRIC_COLUMNS)
             print("Error parsing ENB log file: ", e)
 
+    def _appendMetricRows(self, times, rows, columnTypes):
+        # Turns a batch of tokenized srsRAN metric lines into a 2-D frame, converts it
+        # column by column and appends the result to self.data. Empties the batch.
+        if not rows:
+            return
+        with runStats.phase(self.stats, "convert"):
+            tokens = pd.DataFrame(rows, columns=list(columnTypes))
+            self.data["time"].extend(times)
+            for col, kind in columnTypes.items():
+                if kind == "category":
+                    self.data[col].extend(tokens[col].tolist())
+                    continue
+                values = scalePrefixes(tokens[col])
+                if kind == "int" and values.notna().all():
+                    values = values.astype("int64")
+                self.data[col].extend(values.to_numpy())
+        times.clear()
+        rows.clear()
+
     def parse_epc(self):
+        self._drain(self.iter_epc())
+
+    def iter_epc(self):
         # There are too much diverse data. Therefore, I parsed it without any filtering
-        self.data = {
-            "time":[],
-            "log":[]
-        }
+        self.data = columnStore.makeColumns(MODE_COLUMNS["epc"])
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[1].replace("\n","")
                 if dt and not dt.isspace():
                     self.data["time"].append(ts)
                     self.data["log"].append(dt)
+                    yield
+                else:
+                    self._skip("empty message")
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing EPC log file: ", e)
 
     def parse_ping(self):
-        self.data = {
-            "time":[],
-            "size(byte)":[],
-            "destination":[],
-            "icmp_seq":[],
-            "ttl":[],
-            "pingtime":[]
-        }
+        self._drain(self.iter_ping())
+
+    def iter_ping(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["ping"])
 
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[1].replace("\n","")
 
                 if "icmp_seq" in dt:
@@ -210,78 +501,36 @@ class LogParser:
                     self.data["time"].append(ts)
                     for index, j in enumerate(dt):
                         self.data[list(self.data.keys())[index+1]].append(j.split("=")[-1])
-                        if index == len(dt) - 1:
-                            self.data[list(self.data.keys())[index+1]][-1] += l[-3:-3].strip()
+                    yield
+                else:
+                    self._skip("no icmp_seq")
 
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing Ping log file: ", e)
 
     def parse_iperfServer(self):
-        self.data = {
-            "time":[],
-            "ID":[],
-            "Interval(sec)":[],
-            "Transfer(MBytes)":[],
-            "Bandwidth(MBits/sec)":[]
-        }
-        try:
-            for l in self.raw:
-                if "- - - - - - - -" in l:
-                    break
+        self._drain(self.iter_iperfServer())
 
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
-                dt = l.split("]")[-1].replace("\n","").split(" ")
-                if "sec" in dt or "MBytes" in dt:
-                    dt = [i for i in dt if '' != i]
-                    self.data["ID"].append(l.split("]")[1].split("[")[1].strip())
-                    self.data["time"].append(ts)
-
-                    # Detect bandwidth unit BEFORE removing it
-                    bw_unit = None
-                    if "Mbits/sec" in dt:
-                        bw_unit = "Mbits/sec"
-                    elif "Kbits/sec" in dt:
-                        bw_unit = "Kbits/sec"
-                    elif "bits/sec" in dt:
-                        bw_unit = "bits/sec"
-
-
-                    dt.remove("sec") if "sec" in dt else None
-                    dt.remove("Mbits/sec") if "Mbits/sec" in dt else None
-                    dt.remove("Kbits/sec") if "Kbits/sec" in dt else None
-                    dt.remove("bits/sec") if "bits/sec" in dt else None
-                    # Something strange with the space character here. It doesn't remove the match. TODO
-                    dt.remove("MBytes") if "MBytes" in dt else None
-                    dt.remove("MBytes") if "MBytes" in dt else None
-                    dt.remove("KBytes") if "KBytes" in dt else None
-                    dt.remove("KBytes") if "KBytes" in dt else None
-                    dt.remove("Bytes") if "Bytes" in dt else None
-                    dt.remove("Bytes") if "Bytes" in dt else None
-
-                    if len(dt) >= 7:
-                        self.data["Interval(sec)"].append(dt[0])
-                        self.data["Transfer(MBytes)"].append(dt[2])
-
-                        bw_mbits = normalize_bandwidth_to_mbits(dt[3], bw_unit)
-                        self.data["Bandwidth(MBits/sec)"].append(bw_mbits)
-                        continue
-
-                    for index, j in enumerate(dt):
-                        self.data[list(self.data.keys())[index+2]].append(j)
+    def iter_iperfServer(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["iperfServer"])
+        try:
+            for fields in self._iperfIntervals():
+                self._appendIperfRows(fields)
+                yield
         except Exception as e:
+            self._recordError(e)
             print("Error parsing iperf log file: ", e)
 
     def parse_mgen(self):
-        self.data = {
-            "time":[],
-            "Interval(sec)":[],
-            "Latency(sec)":[],
-            "Bandwidth(MBits/sec)":[]
-        }
+        self._drain(self.iter_mgen())
+
+    def iter_mgen(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["mgen"])
         try:
-            for l in self.raw[2:]:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines(2):
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[-1].replace("\n","").split(" ")
                 if "REPORT" in dt:
                     self.data["time"].append(ts)
@@ -294,94 +543,216 @@ class LogParser:
                             self.data["Bandwidth(MBits/sec)"].append(float(j) / 1000)
                         elif index == 11:
                             self.data["Latency(sec)"].append(j)
+                    yield
+                else:
+                    self._skip("not a REPORT line")
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing mgen log file: ", e)
 
 
-    def parse_iperfClient(self):
-        self.data = {
-            "time":[],
-            "ID":[],
-            "Interval(sec)":[],
-            "Transfer(MBytes)":[],
-            "Bandwidth(MBits/sec)":[],
-            "Retr":[],
-            "Cwnd(KBytes)":[]
-        }
+    def parse_mgenRecv(self):
+        # Per packet RECV lines of an mgen receiver log. One-way latency is the receive time
+        # minus the sent> time of the packet (both mgen time of day, wrapped at midnight).
+        # Fields are collected as text for METRIC_BATCH_ROWS lines and converted per batch into
+        # typed arrays, which are summarized per flow and window of modeArgs["window"] seconds
+        # (see _mgenWindows); a window of 0 keeps one row per packet.
+        packets = {col: array('q') for col in ("time", "flow", "seq", "size(byte)", "latency_ns")}
+        batch = {col: [] for col in ("stamp", "recv", "sent", "flow", "seq", "size")}
         try:
-            for l in self.raw:
-
-                if "- - - - - - - -" in l:
-                    break
-
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
-                dt = l.split("]")[-1].replace("\n","").split(" ")
+            for l in self._lines():
+                if " RECV " not in l:
+                    self._skip("not a RECV line")
+                    continue
+                stamp, event = l.split("] ", 1)
+                tokens = event.split(" ", 2)
+                if len(tokens) < 3 or tokens[1] != "RECV":
+                    self._skip("not a RECV line")
+                    continue
+                fields = dict(MGEN_FIELD.findall(tokens[2]))
+                batch["stamp"].append(stamp[1:])
+                batch["recv"].append(tokens[0])
+                for col in ("sent", "flow", "seq", "size"):
+                    batch[col].append(fields[col])
+                if len(batch["stamp"]) >= METRIC_BATCH_ROWS:
+                    self._appendMgenPackets(batch, packets)
+            self._appendMgenPackets(batch, packets)
 
-                if "sec" in dt or "MBytes" in dt or "KBytes" in dt :
-                    dt = [i for i in dt if '' != i]
-                    self.data["ID"].append(l.split("]")[1].split("[")[1].strip())
-                    self.data["time"].append(ts)
+        except Exception as e:
+            self._recordError(e)
+            # Keep the packets of the lines parsed before the error
+            for col in batch.values():
+                del col[len(batch["size"]):]
+            self._appendMgenPackets(batch, packets)
+            print("Error parsing mgen RECV log file: ", e)
+
+        packets = pd.DataFrame({
+            "time": pd.to_datetime(np.frombuffer(packets["time"], dtype=np.int64), unit="ns"),
+            "flow": np.frombuffer(packets["flow"], dtype=np.int64),
+            "seq": np.frombuffer(packets["seq"], dtype=np.int64),
+            "size(byte)": np.frombuffer(packets["size(byte)"], dtype=np.int64),
+            "Latency(sec)": np.frombuffer(packets["latency_ns"], dtype=np.int64) / 1e9
+        })
+        window = self.modeArgs.get("window", MGEN_WINDOW)
+        with runStats.phase(self.stats, "windows"):
+            packets = packets if window == 0 else self._mgenWindows(packets, window)
+        self.data = {col: packets[col].to_numpy() for col in packets.columns}
+
+    def _appendMgenPackets(self, batch, packets):
+        # Converts a batch of RECV fields to integers (times in ns) and appends them
+        # to the typed arrays of packets. Empties the batch.
+        if not batch["stamp"]:
+            return
+        with runStats.phase(self.stats, "timestamps"):
+            stamps = pd.to_datetime(pd.Series(batch["stamp"]), format=STREAM_DATE_FORMAT)
+        with runStats.phase(self.stats, "convert"):
+            latency = timeOfDayNs(batch["recv"]) - timeOfDayNs(batch["sent"])
+            latency[latency < -SECONDS_PER_DAY * 10**9 // 2] += SECONDS_PER_DAY * 10**9 # sent before midnight, received after
+            packets["time"].frombytes(stamps.to_numpy(dtype="datetime64[ns]").astype(np.int64).tobytes())
+            packets["latency_ns"].frombytes(latency.tobytes())
+            for col, name in (("flow", "flow"), ("seq", "seq"), ("size", "size(byte)")):
+                packets[name].frombytes(np.array(batch[col]).astype(np.int64).tobytes())
+        for col in batch.values():
+            col.clear()
+
+    def _mgenWindows(self, packets, window):
+        # Per flow and window statistics of the received packets:
+        #  - Bandwidth(MBits/sec): received bytes over the window
+        #  - Latency(sec), min and max: one-way latency of the packets
+        #  - Jitter(sec): mean difference of the latency of consecutive packets of the flow
+        #  - Lost, Loss: packets missing from the sequence numbers, counted in the window of the
+        #    packet after the gap, and their share of the packets sent
+        byFlow = packets.groupby("flow", sort=False)
+        gaps = (packets["seq"] - byFlow["seq"].shift(1) - 1).clip(lower=0).fillna(0)
+        jitter = (packets["Latency(sec)"] - byFlow["Latency(sec)"].shift(1)).abs()
+        start = packets["time"].dt.floor(pd.Timedelta(seconds=window))
+
+        grouped = packets.assign(time=start, lost=gaps, jitter=jitter).groupby(["time", "flow"])
+        stats = grouped.agg(
+            packets=("seq", "size"),
+            bytes=("size(byte)", "sum"),
+            latency=("Latency(sec)", "mean"),
+            latencyMin=("Latency(sec)", "min"),
+            latencyMax=("Latency(sec)", "max"),
+            jitter=("jitter", "mean"),
+            lost=("lost", "sum")
+        ).reset_index()
+        lost = stats["lost"].astype("int64")
+        return pd.DataFrame({
+            "time": stats["time"],
+            "flow": stats["flow"],
+            "Interval(sec)": float(window),
+            "packets": stats["packets"],
+            "Bandwidth(MBits/sec)": stats["bytes"] * 8 / window / 1e6,
+            "Latency(sec)": stats["latency"],
+            "LatencyMin(sec)": stats["latencyMin"],
+            "LatencyMax(sec)": stats["latencyMax"],
+            "Jitter(sec)": stats["jitter"],
+            "Lost": lost,
+            "Loss": lost / (lost + stats["packets"])
+        })
 
-                    dt.remove("sec") if "sec" in dt else None
-                    dt.remove("Mbits/sec") if "Mbits/sec" in dt else None
-                    dt.remove("Kbits/sec") if "Kbits/sec" in dt else None
-                    dt.remove("bits/sec") if "bits/sec" in dt else None
-                    # Something strange with the space character here. It doesn't remove the match. TODO
-                    dt.remove("MBytes") if "MBytes" in dt else None
-                    dt.remove("MBytes") if "MBytes" in dt else None
-                    dt.remove("KBytes") if "KBytes" in dt else None
-                    dt.remove("KBytes") if "KBytes" in dt else None
-                    dt.remove("Bytes") if "Bytes" in dt else None
-                    dt.remove("Bytes") if "Bytes" in dt else None
+    def parse_iperfClient(self):
+        self._drain(self.iter_iperfClient())
 
-                    for index, j in enumerate(dt):
-                        self.data[list(self.data.keys())[index+2]].append(j)
+    def iter_iperfClient(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["iperfClient"])
+        try:
+            for fields in self._iperfIntervals():
+                self._appendIperfRows(fields)
+                yield
         except Exception as e:
+            self._recordError(e)
             print("Error parsing iperf log file: ", e)
 
+    def _iperfIntervals(self):
+        # Yields lists of the IPERF_INTERVAL groups (as bytes) of the interval lines, up to the summary.
+        # The log is memory-mapped and scanned IPERF_BLOCK_BYTES at a time, blocks ending on a line end.
+        # A followed log is matched line by line instead, as the lines come in.
+        if self._follow is not None:
+            for l in self._lines():
+                line = l.encode()
+                if IPERF_SUMMARY in line:
+                    return
+                match = IPERF_INTERVAL.match(line)
+                if match:
+                    yield [match.groups()]
+                else:
+                    self._skip("not an interval line")
+            return
+        if os.path.getsize(self.logFile) == 0:
+            return
+        with open(self.logFile, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = mm.find(IPERF_SUMMARY)
+            end = len(mm) if end < 0 else end
+            pos = 0
+            while pos < end:
+                blockEnd = mm.find(b"\n", min(pos + IPERF_BLOCK_BYTES, end), end)
+                blockEnd = end if blockEnd < 0 else blockEnd + 1
+                fields = IPERF_INTERVAL.findall(mm, pos, blockEnd)
+                if self.stats is not None:
+                    lines = mm[pos:blockEnd].count(b"\n")
+                    self.stats.lines += lines
+                    self.stats.bytes += blockEnd - pos
+                    self._skip("not an interval line", lines - len(fields))
+                if fields:
+                    yield fields
+                pos = blockEnd
+
+    def _appendIperfRows(self, fields):
+        # Converts a batch of IPERF_INTERVAL groups column by column and appends them to self.data,
+        # with the transfer in MBytes, the bandwidth in Mbits/sec and the cwnd (clients only) in KBytes
+        stamps, ids, intervals, transfers, transferUnits, bandwidths, bandwidthUnits, retrs, cwnds, cwndUnits = zip(*fields)
+        with runStats.phase(self.stats, "timestamps"):
+            times = pd.to_datetime(pd.Series(decodeFields(stamps)), format=STREAM_DATE_FORMAT)
+        with runStats.phase(self.stats, "convert"):
+            self.data["time"].extend(times.to_numpy())
+            self.data["ID"].extend(decodeFields(ids))
+            self.data["Interval(sec)"].extend(decodeFields(intervals))
+            self.data["Transfer(MBytes)"].extend(normalizeUnits(transfers, transferUnits, TRANSFER_TO_MBYTES))
+            self.data["Bandwidth(MBits/sec)"].extend(normalizeUnits(bandwidths, bandwidthUnits, BANDWIDTH_TO_MBITS))
+            if "Retr" in self.data:
+                # UDP clients have no Retr and Cwnd
+                self.data["Retr"].extend([int(r) if r else None for r in retrs])
+                self.data["Cwnd(KBytes)"].extend(normalizeUnits([c or b"nan" for c in cwnds], cwndUnits, CWND_TO_KBYTES))
+
     def parse_vehicleLog(self):
-        self.data = {
-            "time":[],
-            "log":[]
-        }
+        self._drain(self.iter_vehicleLog())
+
+    def iter_vehicleLog(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["vehicleLog"])
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[1].replace("\n","")
                 if dt and not dt.isspace():
                     self.data["time"].append(ts)
                     self.data["log"].append(dt)
+                    yield
+                else:
+                    self._skip("empty message")
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing Vehicle log file: ", e)
 
     def parse_vehicleOut(self):
-        # this is the order both for predetermined trajectory and GPS_Logger vehicle logging
+        self._drain(self.iter_vehicleOut())
+
+    def iter_vehicleOut(self):
+        # MODE_COLUMNS["vehicleOut"] is the order both for predetermined trajectory and GPS_Logger vehicle logging
         # if you change one of them, please also change the other one
-        self.data = {
-            "num":[],
-            "Longitude":[],
-            "Latitude":[],
-            "Altitude":[],
-            "Pitch":[],
-            "Yaw":[],
-            "Roll":[],
-            "VelocityX":[],
-            "VelocityY":[],
-            "VelocityZ":[],
-            "BatteryVolts":[],
-            "time":[],
-            "GPSFix":[],
-            "NumberOfSatellites":[]
-        }
+        self.data = columnStore.makeColumns(MODE_COLUMNS["vehicleOut"])
+        columns = list(self.data.values())
         try:
-            for l in self.raw:
+            for l in self._lines():
                 l1=l.replace('"(',"") # fixing the grouping for attitude and velocities
                 l1=l1.replace(')"',"") # fixing the grouping for attitude and velocities
                 dt = l1.replace("\n","").split(",")
-                for index, j in enumerate(dt):
-                    self.data[list(self.data.keys())[index]].append(j)
+                for col, j in zip(columns, dt):
+                    col.append(j)
+                yield
                 #
                 # The following code seems to take care of some error or exception, but Anil doesn't recall
                 # exactly what - it's quite possible that it was taken care of already and it's not needed
@@ -397,44 +768,45 @@ class LogParser:
                 #        self.data[list(self.data.keys())[index]].append(j)
 
         except Exception as e:
+            self._recordError(e)
             print("Error parsing Vehicle Out log file: ", e)
 
     def parse_channelSounder(self):
-        self.data = {
-            "time":[],
-            "Measurement No":[],
-            "Power in dB":[]
-        }
+        self._drain(self.iter_channelSounder())
+
+    def iter_channelSounder(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["channelSounder"])
         try:
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[-1].replace("\n","").split(" ")
-                self.data["time"].append(ts)
                 dt = [i for i in dt if '' != i]
                 if len(dt) != 2:
+                    self._skip("not 2 fields")
                     continue
+                self.data["time"].append(ts)
 
                 for index, j in enumerate(dt):
                     self.data[list(self.data.keys())[index+1]].append(j)
+                yield
         except Exception as e:
+            self._recordError(e)
             print("Error parsing channel sounder log file: ", e)
         
     def parse_gnuradioOfdm(self):
-        self.data = {
-            "time":[],
-            "Offset":[],
-            "Source":[],
-            "Key":[],
-            "Value":[]
-        }
+        self._drain(self.iter_gnuradioOfdm())
+
+    def iter_gnuradioOfdm(self):
+        self.data = columnStore.makeColumns(MODE_COLUMNS["gnuradioOfdm"])
         try:
             parseInd = 0
-            for l in self.raw:
-                ts = datetime.strptime(l.split("]")[0].split("[")[1],"%Y-%m-%d %H:%M:%S.%f")
+            for l in self._lines():
+                ts = self._parseTimestamp(l)
                 dt = l.split("]")[-1].replace("\n","")
                 if "Tag Debug: Rx Bytes with SNR" in dt or "Input Stream:" in dt:
                     if parseInd != 2:
                         parseInd += 1
+                        self._skip("tag header")
                         continue
 
                 if parseInd == 2:
@@ -450,239 +822,313 @@ class LogParser:
                     for index, j in enumerate(dt):
                         self.data[list(self.data.keys())[index+1]].append(j)
                     parseInd = 0
+                    yield
+                else:
+                    self._skip("not a tag value")
         except Exception as e:
+            self._recordError(e)
             print("Error parsing Gnuradio OFDM log file: ", e)
 
 
+    def _jsonBatches(self):
+        # Decodes the JSON lines of the log JSON_BATCH_BYTES at a time, each batch with a single
+        # call on the lines joined into one array. A batch with a bad line is decoded line by line,
+        # so the rows before the bad line are yielded before the error is raised.
+        with open(self.logFile, "rb") as f:
+            readBatch = lambda: f.readlines(JSON_BATCH_BYTES)
+            if self.stats is not None:
+                readBatch = self.stats.timed("read", readBatch)
+            for lines in iter(readBatch, []):
+                if self.stats is not None:
+                    self.stats.lines += len(lines)
+                    self.stats.bytes += sum(map(len, lines))
+                    self._skip("blank line", sum(map(bytes.isspace, lines)))
+                lines = [l for l in lines if not l.isspace()]
+                try:
+                    yield jsonLoads(b"[" + b",".join(lines) + b"]")
+                except ValueError:
+                    rows = []
+                    for l in lines:
+                        try:
+                            rows.append(jsonLoads(l))
+                        except ValueError:
+                            yield rows
+                            raise
+                    yield rows
+
+    def _pawprintsTimes(self, table, prefix, epochTimesMs, counts=None, readable=True):
+        # Adds the <prefix>_abs_time column and its local readable time, converted in one go.
+        # epochTimesMs has one time per log row, repeated counts times when the rows hold several records.
+        # Companion times missing from some rows are left empty, and from all rows add no column.
+        times = pd.Series(epochTimesMs)
+        if prefix == "companion" and not times.notna().any():
+            return
+        columns = {prefix + "_abs_time": times.to_numpy()}
+        if readable:
+            columns[prefix + "_time_readable"] = self._epochs_ms_to_readable(times)
+        for col, values in columns.items():
+            table[col] = values if counts is None else np.repeat(values, counts)
+
     def parse_pawprints_4G(self):
-        self.data = []
+        # The log fields are kept once per log row and repeated for each of its cells at the end
+        cells, cellCounts, phoneTimes, connectedPcis, companionTimes = [], [], [], [], []
         try:
-            for log_row_string in self.raw:
-                log_row = json.loads(log_row_string)
-                for cell in log_row["cells"]:
-                    pd_cell = cell.copy()
-                    # Ideally, the below operations should be performed upstream at the Android App.
-                    pd_cell["phone_abs_time"] = log_row["abs_time"]
-                    pd_cell["phone_time_readable"] = self._epoch_ms_to_readable(log_row["abs_time"])
-
-                    # Indicate if this cell is the one to which the Android is connected
-                    pd_cell["is_connected"] = 0
-                    if int(cell["pci"]) == log_row["connected_pci"]:
-                        pd_cell["is_connected"] = 1 
-
-                    if "companion_abs_time" in log_row:
-                        pd_cell["companion_abs_time"] = log_row["companion_abs_time"]
-                        pd_cell["companion_time_readable"] = self._epoch_ms_to_readable(log_row["companion_abs_time"])
-
-                    self.data.append(pd_cell)
-                    
+            for log_rows in self._jsonBatches():
+                for log_row in log_rows:
+                    # every field is read before any list grows, so a bad row leaves them aligned
+                    rowCells, phoneTime = log_row["cells"], log_row["abs_time"]
+                    connectedPci, companionTime = log_row.get("connected_pci"), log_row.get("companion_abs_time")
+                    cells.extend(rowCells)
+                    cellCounts.append(len(rowCells))
+                    phoneTimes.append(phoneTime)
+                    connectedPcis.append(connectedPci)
+                    companionTimes.append(companionTime)
+
         except Exception as e:
+            self._recordError(e)
             print("Error generating PawPrints CSV: ", e)
 
+        # Ideally, the below operations should be performed upstream at the Android App.
+        table = pd.DataFrame.from_records(cells, nrows=len(cells)) if cells else pd.DataFrame()
+        self._pawprintsTimes(table, "phone", phoneTimes, cellCounts)
+        # Indicate if this cell is the one to which the Android is connected
+        if cells:
+            pcis = pd.to_numeric(table["pci"], errors="coerce").to_numpy()
+            connected = np.repeat(pd.Series(connectedPcis, dtype=float).to_numpy(), cellCounts)
+            table["is_connected"] = (pcis == connected).astype(int)
+        self._pawprintsTimes(table, "companion", companionTimes, cellCounts)
+        self.data = {col: table[col] for col in table.columns}
+
     def parse_pawprints_5G(self):
-        self.data = []
+        signals, phoneTimes, companionTimes = [], [], []
         try:
-            for log_row_string in self.raw:
-                log_row = json.loads(log_row_string)
-            
-                if "nr_signal_strength" in log_row and len(log_row['nr_signal_strength'].keys()) > 1:
-                    pd_cell = log_row["nr_signal_strength"].copy()
-                    pd_cell["phone_abs_time"] = log_row["abs_time"]
-                    pd_cell["phone_time_readable"] = self._epoch_ms_to_readable(log_row["abs_time"])
-
-                    if "companion_abs_time" in log_row:
-                        pd_cell["companion_abs_time"] = log_row["companion_abs_time"]
-                        pd_cell["companion_time_readable"] = self._epoch_ms_to_readable(log_row["companion_abs_time"])
-
-                    self.data.append(pd_cell)
-                    
+            for log_rows in self._jsonBatches():
+                for log_row in log_rows:
+                    signal = log_row.get("nr_signal_strength")
+                    if signal is not None and len(signal) > 1:
+                        phoneTime, companionTime = log_row["abs_time"], log_row.get("companion_abs_time")
+                        signals.append(signal)
+                        phoneTimes.append(phoneTime)
+                        companionTimes.append(companionTime)
+                    else:
+                        self._skip("no nr_signal_strength")
+
         except Exception as e:
+            self._recordError(e)
             print("Error generating PawPrints CSV: ", e)
 
+        table = pd.DataFrame.from_records(signals, nrows=len(signals)) if signals else pd.DataFrame()
+        self._pawprintsTimes(table, "phone", phoneTimes)
+        self._pawprintsTimes(table, "companion", companionTimes)
+        self.data = {col: table[col] for col in table.columns}
 
     def parse_pawprints(self):
-        self.data = {"nr_signal_strength": None, "cell_info": None}
-        self.data = {}
-        
+        # Both tables of a PawPrints log, as DataFrames in self.data["nr_signal_strength"] and self.data["cell_info"]
+        signals, signalFields = [], []
+        cells, cellCounts, cellFields = [], [], []
         try:
-            for log_row_string in self.raw:
-                log_row = json.loads(log_row_string)
-            
-                if "nr_signal_strength" in log_row and len(log_row['nr_signal_strength'].keys()) > 1:
-                    pd_cell = log_row["nr_signal_strength"].copy()
-                    pd_cell["phone_abs_time"] = log_row["abs_time"]
-                    pd_cell["rel_time"] = log_row["rel_time"]
-                    pd_cell["companion_abs_time"] = log_row["companion_abs_time"]
-                    self.data["nr_signal_strength"] = pd.concat([self.data["nr_signal_strength"], pd.DataFrame(pd_cell, index =[0])], ignore_index = True)
-
-                for cell in log_row["cells"]:
-                    pd_cell = cell.copy()
-                    pd_cell["phone_abs_time"] = log_row["abs_time"]
-                    pd_cell["rel_time"] = log_row["rel_time"]    
-                    pd_cell["is_connected"] = 0
-                    if int(cell["pci"]) == log_row["connected_pci"]:
-                        pd_cell["is_connected"] = 1 
-
-                    if "companion_abs_time" in log_row:
-                        pd_cell["companion_abs_time"] = log_row["companion_abs_time"]
-
-                    # Indicates whether the current cell is the one that the phone is connected to
-                    pd_cell["is_connected"] = 0
-                    if cell["pci"] == log_row["connected_pci"]:
-                        pd_cell["is_connected"] = 1
-
-                    self.data.append(pd_cell)
-                else:
-                    print("Unsupported PawPrints log type.")
-                    pass
+            for log_rows in self._jsonBatches():
+                for log_row in log_rows:
+                    fields = (log_row["abs_time"], log_row["rel_time"], log_row.get("connected_pci"),
+                              log_row.get("companion_abs_time"))
+                    rowCells = log_row["cells"]
+                    signal = log_row.get("nr_signal_strength")
+                    if signal is not None and len(signal) > 1:
+                        signals.append(signal)
+                        signalFields.append(fields)
+                    cells.extend(rowCells)
+                    cellCounts.append(len(rowCells))
+                    cellFields.append(fields)
 
-                    self.data["cell_info"] = pd.concat([self.data["cell_info"], pd.DataFrame(pd_cell, index = [0])], ignore_index = True)
-                    
         except Exception as e:
+            self._recordError(e)
             print("Error generating PawPrints CSV: ", e)
 
-    
-    def _process_nemo_radio_log(self, nemo_raw_df, processed_nemo_json, cell_id_col, nemo_log_date):
-        # Loop over PCIs. Split PCIs and append KPI of each unique PCI to the corresponding field of the JSON.
+        self.data = {}
+        for name, records, fields, counts in (("nr_signal_strength", signals, signalFields, None),
+                                              ("cell_info", cells, cellFields, cellCounts)):
+            table = pd.DataFrame.from_records(records, nrows=len(records)) if records else pd.DataFrame()
+            phoneTimes, relTimes, connectedPcis, companionTimes = zip(*fields) if fields else ([], [], [], [])
+            self._pawprintsTimes(table, "phone", phoneTimes, counts, readable=False)
+            table["rel_time"] = relTimes if counts is None else np.repeat(relTimes, counts)
+            # Indicates whether the current cell is the one that the phone is connected to
+            if counts is not None and records:
+                pcis = pd.to_numeric(table["pci"], errors="coerce").to_numpy()
+                connected = np.repeat(pd.Series(connectedPcis, dtype=float).to_numpy(), counts)
+                table["is_connected"] = (pcis == connected).astype(int)
+            self._pawprintsTimes(table, "companion", companionTimes, counts, readable=False)
+            self.data[name] = table
+
+    def _nemo_rows(self, nemo_raw_df, nemo_log_date):
+        # Rows of the raw nemo dataframe worth processing, with the log date put in front of their Time
+        # and their local time as datetimes in nemo_abs_time
+        # Dont process a row with an invalid or NaN time string
+        validTime = nemo_raw_df["Time"].astype("string").str.fullmatch(NEMO_TIME).fillna(False).astype(bool)
+        # Dont process a row with all columns as NaN.
+        hasData = nemo_raw_df.drop(columns="Time").notna().any(axis=1)
+        rows = nemo_raw_df[validTime & hasData]
+        self._skip("invalid time", (~validTime).sum())
+        self._skip("no data", (validTime & ~hasData).sum())
+        times = pd.Timestamp(nemo_log_date) + pd.to_timedelta(timeOfDayNs(rows["Time"]), unit="ns")
+        return rows.assign(Time=nemo_log_date + " " + rows["Time"], nemo_abs_time=times)
+
+    def _process_nemo_radio_log(self, nemo_rows, kpi_names, cell_id_col):
+        # Split PCIs and repeat each row once per PCI, splitting the comma separated KPIs of the row alongside.
         # This assumes that number of PCI entries = number of KPI entries, per row, in raw nemo dataframe.
-        row_type = "downlink"
-        for index, row in nemo_raw_df.iterrows():
-            # Dont process a row with an invalid time string
-            if not self._validate_time_format(row["Time"], "%H:%M:%S.%f"):
-                continue
-
-            # Dont process a row with Time as NaN.  
-            if not self._is_series_NonNaN(row["Time"]):
-                continue
-            
-            # Dont process a row with all columns as NaN.  
-            if not self._is_series_NonNaN(row.drop("Time")):
-                continue
-
-            pcis_str = row[cell_id_col]
-            if not isinstance(pcis_str, str) and math.isnan(pcis_str):
-                # PCI is NaN for a row with Uplink info. Dont encapsulate pcis in an array.
-                row_type = "uplink"
-                num_exploded_rows = 1
-            elif isinstance(pcis_str, (int, float)):
-                row_type = "downlink"
-                pci_arr = [pcis_str]
-                num_exploded_rows = len(pci_arr)
-            elif isinstance(pcis_str, str):
-                row_type = "downlink"
-                pci_arr = pcis_str.split(",")
-                num_exploded_rows = len(pci_arr)
-        
-            row["Time"] = nemo_log_date + " " + row["Time"]
-            print(f"log line num:{index}")
-            for kpi_name in processed_nemo_json:
-                # If the KPI is not time, split the string to array, validate with pci count, and store in json. 
-                if "time" not in kpi_name.lower():
-                    kpi_arr = row[kpi_name]
-                    if row_type == "uplink":
-                        kpi_arr = [row[kpi_name]]
-                    elif isinstance(kpi_arr, (int, float)): 
-                        kpi_arr = [kpi_arr for i in range(num_exploded_rows)]
-                    else:
-                        kpi_arr = kpi_arr.split(",")
-                        if len(kpi_arr) != len(pci_arr):
-                            raise Exception("Nemo parsing error. KPI count != PCI cell count.")
-
-                    for kpi_val in kpi_arr:
-                        processed_nemo_json[kpi_name].append(kpi_val)
-                else:
-                    processed_nemo_json[kpi_name].extend([row[kpi_name] for i in range(num_exploded_rows)])
-
-    
-    def _process_nemo_non_cellular_logs(self, nemo_raw_df, processed_nemo_json, nemo_log_date):
-        for index, row in nemo_raw_df.iterrows():
-        
-            # Dont process a row with an invalid time string
-            if not self._validate_time_format(row["Time"], "%H:%M:%S.%f"):
-                continue
-
-            row["Time"] = nemo_log_date + " " + row["Time"]
-
-            # Dont process a row with Time as NaN.  
-            if self._is_variable_NaN(row["Time"]):
+        # Rows with a NaN PCI carry Uplink info and are kept as they are.
+        # read_csv gives text columns (holding comma separated lists) and number columns, both with NaN
+        isText = lambda col: pd.api.types.is_object_dtype(col) or pd.api.types.is_string_dtype(col)
+        pcis = nemo_rows[cell_id_col]
+        downlink = pcis.notna().to_numpy()
+        counts = np.ones(len(nemo_rows), dtype=np.int64)
+        if isText(pcis):
+            counts[downlink] = pcis[downlink].str.count(",").to_numpy(dtype=np.int64) + 1
+
+        exploded = nemo_rows.iloc[np.repeat(np.arange(len(nemo_rows)), counts)].reset_index(drop=True)
+        for kpi_name in kpi_names:
+            # KPIs with time in their name are repeated, the other text KPIs split
+            kpi = nemo_rows[kpi_name]
+            if "time" in kpi_name.lower() or not isText(kpi):
                 continue
-            
-            # Dont process a row with all columns as NaN.  
-            if not self._is_series_NonNaN(row.drop("Time")):
+            split = downlink & kpi.notna().to_numpy()
+            if not split.any():
                 continue
-
-            for kpi_name in processed_nemo_json:
-                processed_nemo_json[kpi_name].append(row[kpi_name])
-
-    
-    def _format_nemo_gps_times(self, str_time):
-        epoch_time =  datetime.strptime(str_time, '%Y-%m-%d %H:%M:%S.%f').timestamp()*1000.0 # in milliseconds
-        return epoch_time
+            lists = kpi[split]
+            if (lists.str.count(",").to_numpy(dtype=np.int64) + 1 != counts[split]).any():
+                raise Exception("Nemo parsing error. KPI count != PCI cell count.")
+            # the lists of all rows are split at once, the pieces come out in row order
+            values = exploded[kpi_name].to_numpy(dtype=object)
+            values[np.repeat(split, counts)] = ",".join(lists.tolist()).split(",")
+            exploded[kpi_name] = values
+        return exploded
 
     def parse_nemo(self):
         LTE_CELL_ID_FIELD = "Physical layer identity (LTE detected)"
         NR_CELL_ID_FIELD = "Physical cell identity (NR SpCell)"
         try:
-            nemo_raw_df = pd.read_csv(self.logFile)
+            with runStats.phase(self.stats, "read"):
+                nemo_raw_df = pd.read_csv(self.logFile)
+            if self.stats is not None:
+                self.stats.lines += len(nemo_raw_df)
+                self.stats.bytes += os.path.getsize(self.logFile)
             cell_id_col = LTE_CELL_ID_FIELD if LTE_CELL_ID_FIELD in nemo_raw_df.columns else NR_CELL_ID_FIELD if NR_CELL_ID_FIELD in nemo_raw_df.columns else None 
-            
-            nemo_raw_df.dropna(axis=1, how="all") # Supposed to drop NaN rows but it does not. I drop it manually below.
-            processed_nemo_json = {}
 
-            # Initialize processed json with fields as the columns of the raw nemo dataframe
-            for col in nemo_raw_df.columns:
-                # Remove columns with all NaN values
-                if self._is_series_NonNaN(nemo_raw_df[col]):
-                    processed_nemo_json[col] = []
+            # Remove columns with all NaN values
+            kpi_names = [col for col in nemo_raw_df.columns if nemo_raw_df[col].notna().any()]
+            nemo_rows = self._nemo_rows(nemo_raw_df, self.modeArgs["nemo_date"])
 
             if cell_id_col is not None:
-                self._process_nemo_radio_log(nemo_raw_df, processed_nemo_json, cell_id_col, self.modeArgs["nemo_date"])
-            else:
-                self._process_nemo_non_cellular_logs(nemo_raw_df, processed_nemo_json, self.modeArgs["nemo_date"])
+                nemo_rows = self._process_nemo_radio_log(nemo_rows, kpi_names, cell_id_col)
 
-            processed_nemo_df = pd.DataFrame(processed_nemo_json)
-            processed_nemo_df["nemo_abs_time"] = processed_nemo_df["Time"].apply(self._format_nemo_gps_times)
-            self.data = processed_nemo_df.to_dict()
+            processed_nemo_df = nemo_rows[kpi_names].reset_index(drop=True)
+            processed_nemo_df["nemo_abs_time"] = localToEpochMs(nemo_rows["nemo_abs_time"])
+            self.data = {col: processed_nemo_df[col] for col in processed_nemo_df.columns}
 
         except Exception as e:
+            self._recordError(e)
             print("Error generating Nemo CSV: ", e)
 
     '''
     The below helper / library functions are meant to be re-used across parser functions
     '''
 
-    def _epoch_ms_to_readable(self, epoch_time_ms):
-        date_obj = datetime.fromtimestamp(epoch_time_ms/1000.0)
-        return date_obj.strftime('%Y-%m-%d %H:%M:%S.%f')
+    def _epochs_ms_to_readable(self, epoch_times_ms):
+        # Local time text of epoch milliseconds for a whole column, missing times stay empty
+        return pd.Series(epochMsToLocal(epoch_times_ms)).dt.strftime('%Y-%m-%d %H:%M:%S.%f').to_numpy()
+
 
-    def _is_series_NonNaN(self, pd_series):
-        term_wise_nans = pd.isna(pd_series)
-        if isinstance(term_wise_nans, bool):
-            return term_wise_nans is False
-        else:
-            return False in term_wise_nans.unique()
 
-    def _validate_time_format(self, time_str, time_format):
+    def _csvFName(self):
+        if not isinstance(self.outputFname, str):
+            return self.outputFname
+        return tableIO.outputName(self.outputFname, self.outputFormat)
+
+    def _writeChunk(self, writer):
+        # Writes the buffered rows and empties the columns in place, since the
+        # running iter_* generator keeps appending to the same columns
+        with runStats.phase(self.stats, "frame"):
+            chunkDf = columnStore.toFrame(self.data)
+        with runStats.phase(self.stats, "write"):
+            writer.write(chunkDf)
+        for col in self.data.values():
+            col.clear()
+        return chunkDf
+
+    def _printSummary(self, rows, columns, csvFName):
+        if self.stats is not None:
+            self.stats.rows = rows
+        print('Saved ' + str(rows) + ' lines of data in ' + str(csvFName))
+        print('Available fields:')
+        for col in columns:
+            print(col)
+
+    def exportCsv(self):
         try:
-            datetime.strptime(time_str, time_format)
-            return True
+            with runStats.phase(self.stats, "frame"):
+                csvDf = columnStore.toFrame(self.data)
+            csvFName = self._csvFName()
+            with runStats.phase(self.stats, "write"):
+                tableIO.writeTable(csvDf, csvFName, self.outputFormat, index=False)
+            self._printSummary(csvDf.shape[0], csvDf.columns, csvFName)
         except Exception as e:
-            return False
-        
-    def _is_variable_NaN(self, var):
-        return isinstance(var, (float, int)) and math.isnan(var)
+            self._recordError(e)
+            print("Error generating CSV: ", e)
 
+    def streamCsv(self, mode, chunkRows=STREAM_CHUNK_ROWS):
+        # Parses the log with its iter_* generator and writes the output every chunkRows rows,
+        # so memory use depends on the chunk size and not on the size of the log
+        try:
+            csvFName = self._csvFName()
+            rows = 0
+            chunkDf = None
+            with tableIO.TableWriter(csvFName, self.outputFormat, date_format=STREAM_DATE_FORMAT) as writer, \
+                    runStats.phase(self.stats, "tokenize"):
+                for _ in getattr(self, "iter_" + mode)():
+                    if self._bufferedRows() >= chunkRows:
+                        chunkDf = self._writeChunk(writer)
+                        rows += chunkDf.shape[0]
+                if chunkDf is None or self._bufferedRows() > 0:
+                    chunkDf = self._writeChunk(writer)
+                    rows += chunkDf.shape[0]
+            self._printSummary(rows, chunkDf.columns, csvFName)
+        except Exception as e:
+            self._recordError(e)
+            print("Error generating CSV: ", e)
 
-    def exportCsv(self):
+    def followCsv(self, mode, stop, chunkRows=STREAM_CHUNK_ROWS, flushInterval=FOLLOW_FLUSH_INTERVAL):
+        # Parses the log while it grows, until stop (a threading.Event) is set or the parser ends,
+        # e.g. at the iperf summary. The iter_* generator runs once over the whole log, so parser
+        # state (like parseInd of gnuradioOfdm) carries over between appends. Rows are written
+        # every chunkRows rows, at least every flushInterval seconds and whenever the log is idle.
         try:
-            csvDf = pd.DataFrame.from_dict(self.data)
-            csvFName = self.outputFname if ".csv" in self.outputFname else self.outputFname + ".csv"
-            csvDf.to_csv(csvFName, index=False)
-            print('Saved ' + str(csvDf.shape[0]) + ' lines of data in ' + csvFName)
-            print('Available fields:')
-            for col in csvDf.columns:
-                print(col)
+            csvFName = self._csvFName()
+            rows = 0
+            columns = []
+            with tableIO.TableWriter(csvFName, self.outputFormat, date_format=STREAM_DATE_FORMAT) as writer:
+                lastFlush = time.monotonic()
+
+                def flush():
+                    nonlocal rows, columns, lastFlush
+                    if self._pending is not None:
+                        self._pending()
+                    if self._bufferedRows() > 0:
+                        chunkDf = self._writeChunk(writer)
+                        with runStats.phase(self.stats, "write"):
+                            writer.flush()
+                        rows += chunkDf.shape[0]
+                        columns = chunkDf.columns
+                    lastFlush = time.monotonic()
+
+                self._follow = stop
+                self._onIdle = flush
+                with runStats.phase(self.stats, "tokenize"):
+                    for _ in getattr(self, "iter_" + mode)():
+                        if self._bufferedRows() >= chunkRows or time.monotonic() - lastFlush >= flushInterval:
+                            flush()
+                flush()
+            self._printSummary(rows, columns, csvFName)
         except Exception as e:
+            self._recordError(e)
             print("Error generating CSV: ", e)
 
 
@@ -690,15 +1136,326 @@ def create_mode_args(args):
     mode_args = {}
     if args.nemo_date:
         mode_args["nemo_date"] = args.nemo_date
+    if args.window is not None:
+        mode_args["window"] = args.window
 
     return mode_args
 
+def runParser(logFile, mode, outputFname, modeArgs, stream=False, chunkRows=STREAM_CHUNK_ROWS, outputFormat=None,
+              stats=None):
+    # stats - runStats.RunStats filled in with the phase times and counts of the parse, or None
+    # Returns the errors the parser printed, an empty list when the whole log was written
+    parser =  LogParser(logFile, outputFname, modeArgs, outputFormat, stats)
+    if stream and hasattr(parser, "iter_" + mode):
+        parser.streamCsv(mode, chunkRows)
+        return parser.errors
+    if stream:
+        print("Streaming is not available for mode " + mode + ", parsing the whole log")
+    with runStats.phase(stats, "tokenize"):
+        getattr(parser, "parse_" + mode)()
+    parser.exportCsv()
+    return parser.errors
+
+def followOutputName(logFile, output, outputFormat=None):
+    # Output of one of several followed logs: <output directory or log directory>/<log name>
+    outDir = output if isinstance(output, str) else os.path.dirname(logFile)
+    return tableIO.outputName(os.path.join(outDir, Path(logFile).stem), outputFormat)
+
+def followLogs(logFiles, mode, output, modeArgs, chunkRows=STREAM_CHUNK_ROWS,
+               flushInterval=FOLLOW_FLUSH_INTERVAL, outputFormat=None, statsFormat=None, statsFile=None):
+    """ parses running logs as they grow, each in its own thread, until interrupted (Ctrl-C)
+        or until every parser ends (e.g. at the iperf summary)
+        Parameters:
+            logFiles - logs to follow, they may not exist yet when their mode is given
+            mode - parsing mode of all logs, None detects it per log (see sniffLogFormat)
+            output - output file of a single log, else the directory of the outputs
+            chunkRows, flushInterval - see LogParser.followCsv
+            outputFormat - csv, parquet or feather; only CSV outputs can be read before the end
+            statsFormat - table or json reports the statistics of each log at the end (see runStats),
+                          their read time includes the time spent waiting for new lines
+            statsFile - file the statistics are appended to, default is standard error
+    """
+    stop = threading.Event()
+    threads = []
+    parsers = []
+    for logFile in logFiles:
+        logMode = mode or (sniffLogFormat(logFile) if os.path.exists(logFile) else None)
+        if logMode is None:
+            print("Could not detect the format of " + logFile + ", choose it with -m/--mode")
+            continue
+        if not hasattr(LogParser, "iter_" + logMode):
+            print("Following is not available for mode " + logMode + ", skipping " + logFile)
+            continue
+        outputFname = output if len(logFiles) == 1 else followOutputName(logFile, output, outputFormat)
+        stats = runStats.RunStats("log2csv", logFile + " [" + logMode + "]") if statsFormat else None
+        parser = LogParser(logFile, outputFname, modeArgs, outputFormat, stats)
+        parsers.append(parser)
+        thread = threading.Thread(target=parser.followCsv, args=(logMode, stop, chunkRows, flushInterval),
+                                  name=logFile, daemon=True)
+        print("Following " + logFile + " [" + logMode + "] into " + str(parser._csvFName()))
+        thread.start()
+        threads.append(thread)
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(FOLLOW_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        # the parsers read what is left of their logs, write their last rows and close their outputs
+        stop.set()
+        for thread in threads:
+            thread.join()
+    for parser in parsers:
+        if parser.stats is not None:
+            parser.stats.report(statsFormat, statsFile)
+
+# Bytes read from the start of a log to recognize its format
+SNIFF_BYTES = 8192
+
+# Signatures of the log formats, tried in order on the start of a log; the first match gives the mode.
+# Specific markers (srsRAN banners, iperf headers) come before the generic line shapes.
+SNIFF_PATTERNS = [
+    (r'\A\s*\{.*"nr_signal_strength"', "pawprints_5G"),
+    (r'\A\s*\{.*"cells"', "pawprints_4G"),
+    (r'\A\d+,-?\d+\.\d+,-?\d+\.\d+,[^\n]*"\(', "vehicleOut"),
+    (r'\A(?:[^\n\[]*,)?"?Time"?(?:,|\r?$)', "nemo"),
+    (r'Software Radio Systems LTE eNodeB|srsran/enb\.conf', "enb"),
+    (r'Software Radio Systems EPC|srsran/epc\.conf', "epc"),
+    (r'Software Radio Systems LTE UE|srsran/ue\.conf', "ue"),
+    (r'Found CELL', "cellSearch"),
+    (r'Connecting to host|\bRetr\s+Cwnd\b', "iperfClient"),
+    (r'Server listening|Accepted connection from|\[ ID\] Interval\s+Transfer\s+Bitrate\s*$', "iperfServer"),
+    (r'^\[[^\]]*\] \d{2}:\d{2}:\d{2}\.\d+ (?:LISTEN|RECV|REPORT)\b', "mgen"),
+    (r'bytes of data|icmp_seq=|Looking for connection', "ping"),
+    (r'Tag Debug: Rx Bytes with SNR|Input Stream:', "gnuradioOfdm"),
+    (r'\[aerpawlib\]|\.plan file|Taking off', "vehicleLog"),
+    (r'^\[[^\]]*\]\s*\d+\s+-?\d+(?:\.\d+)?\s*$', "channelSounder")
+]
+SNIFF_PATTERNS = [(re.compile(pattern, re.M), mode) for pattern, mode in SNIFF_PATTERNS]
+
+def sniffLogFormat(path, sniffBytes=SNIFF_BYTES):
+    """ recognizes the format of a log from its first sniffBytes bytes
+        Parameters:
+            path - log file
+            sniffBytes - bytes read from the start of the log
+        Returns:
+            the parsing mode (as for -m/--mode), or None when no format matches.
+            mgen receiver logs give mgen, mgenRecv has to be asked for with -m,
+            and mgen sender logs (which have no reports) are not recognized.
+    """
+    with open(path, "rb") as f:
+        head = f.read(sniffBytes).decode("utf-8", errors="replace")
+    for pattern, mode in SNIFF_PATTERNS:
+        if pattern.search(head):
+            return mode
+    return None
+
+# Log files found in the node directories (LW1, LW2, SPN1, ...) of an experiment and their parsing mode
+BATCH_PATTERNS = [
+    ("*_radio_log.txt", "ue"),
+    ("*_radio_enb_log.txt", "enb"),
+    ("*_radio_epc_log.txt", "epc"),
+    ("*_traffic_log.txt", "ping"),
+    ("*_iperfclient_log.txt", "iperfClient"),
+    ("*_iperfserver*_log.txt", "iperfServer"),
+    ("*_mgenreceiver_log.txt", "mgen"),
+    ("mgen_lw*.log", "mgen"),
+    ("lw[0-9]*.txt", "mgen"),
+    ("*_vehicleOut.txt", "vehicleOut"),
+    ("*_vehicle_log.txt", "vehicleLog")
+]
+
+# Directories of an experiment that hold pipeline outputs rather than node logs
+BATCH_OUTPUT_DIRS = ("parsed_csvs", "merged_csvs")
+
+BATCH_LOG_NAME = re.compile(r"^(?:(\d{4}-\d{2}-\d{2})_(\d{2}_\d{2}_\d{2})_)?(.+?)(?:_log)?\.(?:txt|log|jsonl?)$")
+
+def findExperimentLogs(expDir, outputFormat="csv"):
+    """ finds the logs of an experiment directory that have a known parsing mode,
+        from their name (BATCH_PATTERNS) or else from their content (sniffLogFormat)
+        Parameters:
+            expDir - experiment directory, e.g. jan_21_emulation
+            outputFormat - csv, parquet or feather, gives the extension of the outputs
+        Returns:
+            list of (log file, mode, output file) with outputs in expDir/parsed_csvs
+    """
+    expDir = Path(expDir)
+    outDir = expDir / "parsed_csvs"
+    found = []
+    for nodeDir in sorted(p for p in expDir.iterdir() if p.is_dir() and p.name not in BATCH_OUTPUT_DIRS):
+        matched = set()
+        for pattern, mode in BATCH_PATTERNS:
+            for logFile in sorted(nodeDir.glob(pattern)):
+                runTime, tag = BATCH_LOG_NAME.match(logFile.name).group(2, 3)
+                found.append([logFile, mode, nodeDir.name.lower() + "_" + tag, runTime])
+                matched.add(logFile)
+        # Logs named otherwise are recognized from their content
+        for logFile in sorted(nodeDir.iterdir()):
+            nameMatch = BATCH_LOG_NAME.match(logFile.name)
+            if logFile in matched or not nameMatch or not logFile.is_file():
+                continue
+            mode = sniffLogFormat(logFile)
+            if mode is not None:
+                runTime, tag = nameMatch.group(2, 3)
+                found.append([logFile, mode, nodeDir.name.lower() + "_" + tag, runTime])
+
+    # Nodes that ran several times in the same experiment get the start time in the name
+    names = [name for _, _, name, _ in found]
+    jobs = []
+    for logFile, mode, name, runTime in found:
+        if names.count(name) > 1 and runTime:
+            name += "_" + runTime
+        jobs.append((str(logFile), mode, tableIO.outputName(outDir / name, outputFormat)))
+    return jobs
+
+# Bump in the same change that alters the output of a parser, so cached CSVs of unchanged logs are rebuilt.
+#  2: iperf Transfer in MBytes and server Bandwidth in Mbits/sec (were in the units of the log), typed columns
+#  3: values with the micro (u) prefix in the UE and eNB metrics, NaN in version 2
+PARSER_VERSION = 3
+
+# Manifest kept in each experiment directory, next to parsed_csvs/
+CACHE_MANIFEST = ".log2csv_cache.json"
+
+def fileDigest(path, blockSize=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fileState(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+class ParseCache:
+    """ manifest of the logs of one experiment directory that were already parsed,
+        keyed on the log content hash together with the parser mode and version
+    """
+    def __init__(self, expDir):
+        self.expDir = expDir
+        self.fname = os.path.join(expDir, CACHE_MANIFEST)
+        self.entries = {}
+        if os.path.exists(self.fname):
+            try:
+                with open(self.fname) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print("Ignoring unreadable cache manifest " + self.fname + ": ", e)
+
+    def _key(self, path):
+        # Paths are stored relative to the experiment, so the manifest survives moving the archive
+        return os.path.relpath(path, self.expDir)
+
+    def isFresh(self, logFile, mode, outputFname):
+        entry = self.entries.get(self._key(logFile))
+        if (entry is None or entry["mode"] != mode or entry["version"] != PARSER_VERSION
+                or entry["output"] != self._key(outputFname) or not os.path.exists(outputFname)):
+            return False
+        state = fileState(logFile)
+        if state["size"] != entry["size"]:
+            return False
+        if state["mtime_ns"] != entry["mtime_ns"]:
+            # Touched but maybe not modified, the content hash decides
+            if fileDigest(logFile) != entry["sha256"]:
+                return False
+            entry.update(state)
+        return True
+
+    def record(self, logFile, mode, outputFname, state):
+        self.entries[self._key(logFile)] = dict(state, mode=mode, version=PARSER_VERSION,
+                                                output=self._key(outputFname))
+
+    def save(self):
+        tmpName = self.fname + ".tmp"
+        with open(tmpName, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmpName, self.fname)
+
+def _batchJob(logFile, mode, outputFname, chunkRows, outputFormat):
+    # Runs in a worker process; the parser output is returned so jobs don't interleave on screen,
+    # with whether the parse failed. The log state is taken before parsing, so a log that grows
+    # meanwhile is parsed again next time
+    state = fileState(logFile)
+    state["sha256"] = fileDigest(logFile)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            failed = bool(runParser(logFile, mode, outputFname, {}, stream=True, chunkRows=chunkRows,
+                                    outputFormat=outputFormat))
+        except Exception as e:
+            print("Error parsing " + logFile + ": ", e)
+            failed = True
+    return out.getvalue(), state, failed
+
+def batchParse(expDirs, jobs=None, chunkRows=STREAM_CHUNK_ROWS, useCache=True, outputFormat="csv"):
+    """ parses all logs of the given experiment directories in a process pool
+        Parameters:
+            expDirs - experiment directories
+            jobs - number of worker processes, default is the number of cores
+            chunkRows - rows buffered per chunk by each streaming parser
+            useCache - skip logs that did not change since their last parse
+            outputFormat - csv, parquet or feather
+    """
+    tasks = []
+    caches = []
+    skipped = 0
+    for expDir in expDirs:
+        cache = ParseCache(expDir)
+        caches.append(cache)
+        for logFile, mode, out in findExperimentLogs(expDir, outputFormat):
+            if useCache and cache.isFresh(logFile, mode, out):
+                skipped += 1
+                continue
+            tasks.append((cache, logFile, mode, out))
+    if skipped:
+        print("Skipped " + str(skipped) + " unchanged logs")
+    if not tasks:
+        if not skipped:
+            print("No known logs found in " + ", ".join(str(d) for d in expDirs))
+        for cache in caches:
+            cache.save()
+        return
+
+    for outDir in {os.path.dirname(out) for _, _, _, out in tasks}:
+        os.makedirs(outDir, exist_ok=True)
+
+    # Biggest logs first, so a large log started last doesn't leave the other cores idle
+    tasks.sort(key=lambda task: os.path.getsize(task[1]), reverse=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_batchJob, logFile, mode, out, chunkRows, outputFormat): (cache, logFile, mode, out)
+                   for cache, logFile, mode, out in tasks}
+        for future in as_completed(futures):
+            cache, logFile, mode, out = futures[future]
+            output, state, failed = future.result()
+            # The field list of every output would drown the summary, keep the messages only
+            report = output.split("Available fields:")[0]
+            print("[" + mode + "] " + logFile + "\n" + report.rstrip())
+            # Don't cache a partial output
+            if not failed:
+                cache.record(logFile, mode, out, state)
+
+    for cache in caches:
+        cache.save()
+
 def main():
     args = parseArgs()
+    if args.batch:
+        batchParse(args.logfile, args.jobs, args.chunk_rows, useCache=not args.no_cache,
+                   outputFormat=args.output_format or "csv")
+        return
+    if args.follow:
+        followLogs(args.logfile, args.mode, args.output, create_mode_args(args), args.chunk_rows,
+                   args.flush_interval, args.output_format, args.stats_format if args.stats else None, args.stats_file)
+        return
+    mode = args.mode or sniffLogFormat(args.logfile[0])
+    if mode is None:
+        sys.exit("Could not detect the format of " + args.logfile[0] + ", choose it with -m/--mode")
+    if args.mode is None:
+        print("Detected mode " + mode + " for " + args.logfile[0])
     mode_args = create_mode_args(args)
-    parser =  LogParser(args.logfile, args.output, mode_args)
-    getattr(parser, "parse_" + args.mode)()
-    parser.exportCsv()
+    stats = runStats.RunStats("log2csv", args.logfile[0] + " [" + mode + "]") if args.stats else None
+    runParser(args.logfile[0], mode, args.output, mode_args, args.stream, args.chunk_rows,
+              args.output_format, stats)
+    if stats is not None:
+        stats.report(args.stats_format, args.stats_file)
 
 
 if __name__ == '__main__':
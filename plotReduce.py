@@ -0,0 +1,161 @@
+""" Reduction of long series before they are plotted (csvPlot, improved_plot).
+
+    Drawing every row of a long mgen or eNB log is slow and unreadable, while a figure
+    only has so many pixel columns. Downsampling keeps about max_points rows:
+     - minmax: the rows with the min and max y of each x bucket (max_points / 2 buckets),
+               which keeps spikes and the envelope of the series
+     - lttb: Largest-Triangle-Three-Buckets, one row per bucket chosen to keep the visual shape
+    Time aggregation instead averages the series over fixed time buckets and adds the
+    5th and 95th percentiles of the first one as <column>_p5 and <column>_p95.
+"""
+import numpy as np
+import pandas as pd
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+# About two rows per pixel column of the default 10 inch wide figure at 100 dpi
+MAX_POINTS = 2000
+
+
+def _dates(x):
+    """ returns x as datetimes, or None when it is neither datetimes nor dates as text """
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x
+    if pd.api.types.is_numeric_dtype(x):
+        return None
+    try:
+        return pd.to_datetime(x)
+    except (ValueError, TypeError):
+        return None
+
+
+def axisValues(x):
+    """ returns the x axis as a float array to bucket on: numbers as they are,
+        datetimes (or dates as text) in ns, anything else by row position
+    """
+    x = pd.Series(x)
+    if pd.api.types.is_numeric_dtype(x):
+        return x.to_numpy(dtype=float)
+    dates = _dates(x)
+    if dates is None:
+        return np.arange(len(x), dtype=float)
+    ns = pd.Series(dates).to_numpy(dtype="datetime64[ns]")
+    values = ns.astype("int64").astype(float)
+    values[np.isnat(ns)] = np.nan
+    return values
+
+
+def minMaxIndices(x, y, buckets):
+    """ returns the positions of the min and max y of each of buckets equal x ranges,
+        plus the first and last point, in x order. Points with a missing x or y are dropped.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    idx = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    if len(idx) <= 2 * buckets:
+        return idx
+    xv, yv = x[idx], y[idx]
+    lo, hi = xv.min(), xv.max()
+    bucket = np.zeros(len(idx), dtype=int) if hi == lo else \
+        np.minimum(((xv - lo) / (hi - lo) * buckets).astype(int), buckets - 1)
+
+    order = np.lexsort((yv, bucket))
+    sortedBuckets = bucket[order]
+    change = sortedBuckets[1:] != sortedBuckets[:-1]
+    first = np.concatenate(([True], change))
+    last = np.concatenate((change, [True]))
+    keep = np.unique(np.concatenate((order[first], order[last], [0, len(idx) - 1])))
+    return idx[keep]
+
+
+def lttbIndices(x, y, threshold):
+    """ returns the positions of threshold points chosen by Largest-Triangle-Three-Buckets,
+        in x order. Points with a missing x or y are dropped.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    idx = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    n = len(idx)
+    if threshold >= n or threshold < 3:
+        return idx
+    xv, yv = x[idx], y[idx]
+
+    # the first and last points are kept, the others split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nextX, nextY = xv[end:edges[i + 2]].mean(), yv[end:edges[i + 2]].mean()
+        else:
+            nextX, nextY = xv[-1], yv[-1]
+        # area of the triangle between the last kept point, each candidate and the next bucket's average
+        area = np.abs((xv[a] - nextX) * (yv[start:end] - yv[a]) - (xv[a] - xv[start:end]) * (nextY - yv[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return idx[keep]
+
+
+def downsample(data, x_column, y_columns, method="minmax", max_points=MAX_POINTS):
+    """ returns the rows of data kept for plotting y_columns against x_column,
+        the union of the rows each y column keeps
+        Parameters:
+            method - minmax or lttb, see the module docstring
+            max_points - about the number of rows kept per y column
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method {method}, use one of {DOWNSAMPLE_METHODS}")
+    if len(data) <= max_points:
+        return data
+    x = axisValues(data[x_column])
+    keep = []
+    for column in y_columns:
+        y = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype=float)
+        if method == "minmax":
+            keep.append(minMaxIndices(x, y, max(1, max_points // 2)))
+        else:
+            keep.append(lttbIndices(x, y, max_points))
+    return data.iloc[np.unique(np.concatenate(keep))]
+
+
+def aggregateTime(data, x_column, y_columns, seconds):
+    """ returns the mean of y_columns over buckets of seconds of x_column, with the 5th
+        and 95th percentiles of the first y column as <column>_p5 and <column>_p95.
+        x_column must hold datetimes (or dates as text) or numbers (taken as seconds).
+    """
+    x = data[x_column]
+    dates = _dates(x)
+    if dates is not None:
+        key = pd.Series(dates, index=data.index).dt.floor(pd.Timedelta(seconds=seconds))
+    elif pd.api.types.is_numeric_dtype(x):
+        key = np.floor(x / seconds) * seconds
+    else:
+        raise ValueError(f"Time aggregation needs dates or numbers in {x_column}")
+
+    values = data[y_columns].apply(pd.to_numeric, errors="coerce")
+    grouped = values.groupby(key.rename(x_column))
+    result = grouped.mean()
+    band = y_columns[0]
+    result[band + "_p5"] = grouped[band].quantile(0.05)
+    result[band + "_p95"] = grouped[band].quantile(0.95)
+    return result.reset_index()
+
+
+def reduceForPlot(data, x_column, y_columns, method=None, max_points=MAX_POINTS, aggregate=None):
+    """ returns data reduced for plotting: aggregated over aggregate seconds when given,
+        then downsampled with method (minmax or lttb) when given. Without either, data is returned as is.
+        Dates stored as text in x_column are converted, so they are drawn on a date axis
+        rather than as one category per row.
+    """
+    if not aggregate and not method:
+        return data
+    dates = _dates(data[x_column])
+    if dates is not None:
+        data = data.assign(**{x_column: dates})
+    if aggregate:
+        data = aggregateTime(data, x_column, y_columns, aggregate)
+    if method:
+        data = downsample(data, x_column, y_columns, method, max_points)
+    return data
@@ -0,0 +1,168 @@
+""" Phase timings and counters of a pipeline run (log2csv, csvMerge), shown with --stats.
+
+    A RunStats collects:
+     - the wall time of each phase of the run, e.g. read, timestamps, tokenize, frame, write.
+       Phases nest: time spent in an inner phase only counts for the inner one, so the
+       phases add up to the time of the run and show where it went
+     - lines and bytes read, rows emitted
+     - lines or rows skipped, counted per reason (headers, lines without data, malformed lines)
+     - errors the tools report instead of raising
+     - peak resident memory of the process (resource module, Unix only)
+    report() writes them as a table, or as one JSON object for dashboards.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+REPORT_FORMATS = ("table", "json")
+
+
+def peakRssMb():
+    """ returns the peak resident memory of this process in MB, or None where it is unknown """
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss * (1 if sys.platform == "darwin" else 1024) / 2**20
+
+
+def phase(stats, name):
+    """ returns a context manager timing phase name of stats, or doing nothing when stats is None """
+    return nullcontext() if stats is None else stats.phase(name)
+
+
+class RunStats:
+    """ timings and counters of one run of a tool on one input """
+    def __init__(self, tool, source=None):
+        self.tool = tool
+        self.source = source # e.g. the log file and mode
+        self.phases = {} # name -> seconds, in the order the phases first ran
+        self.lines = 0
+        self.bytes = 0
+        self.rows = 0
+        self.skipped = {} # reason -> count
+        self.errors = []
+        self._current = None # phase the clock runs for, None is time outside every phase
+        self._start = self._since = time.perf_counter()
+        self._end = None
+
+    def _switch(self, name):
+        # Charges the time since the last switch to the current phase, then runs the clock for name.
+        # Returns the phase that was running, to switch back to it.
+        now = time.perf_counter()
+        previous = self._current
+        if previous is not None:
+            self.phases[previous] += now - self._since
+        if name is not None and name not in self.phases:
+            self.phases[name] = 0.0
+        self._current, self._since = name, now
+        return previous
+
+    @contextmanager
+    def phase(self, name):
+        previous = self._switch(name)
+        try:
+            yield
+        finally:
+            self._switch(previous)
+
+    def timed(self, name, func):
+        """ returns func counting its calls as phase name, cheaper than phase() for a call per line """
+        def call(*args):
+            previous = self._switch(name)
+            try:
+                return func(*args)
+            finally:
+                self._switch(previous)
+        return call
+
+    def reading(self, lines, name="read"):
+        """ iterates over lines, counting them and the time spent getting each as phase name """
+        lines = iter(lines)
+        while True:
+            previous = self._switch(name)
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            finally:
+                self._switch(previous)
+            self.lines += 1
+            yield line
+
+    def skip(self, reason, count=1):
+        if count > 0:
+            self.skipped[reason] = self.skipped.get(reason, 0) + int(count)
+
+    def error(self, e):
+        """ records an error (exception or text), with the number of lines read when it happened """
+        message = type(e).__name__ + ": " + str(e) if isinstance(e, BaseException) else str(e)
+        self.errors.append({"error": message, "lines_read": self.lines})
+
+    def finish(self):
+        """ stops the clock of the run, later calls keep the first end """
+        if self._end is None:
+            self._switch(None)
+            self._end = time.perf_counter()
+
+    def asDict(self):
+        """ returns the statistics as a JSON-serializable dict, rates are per second of the whole run """
+        self.finish()
+        seconds = self._end - self._start
+        rate = lambda count: count / seconds if seconds > 0 else None
+        return {
+            "tool": self.tool,
+            "source": self.source,
+            "seconds": seconds,
+            "phases": dict(self.phases),
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "lines_per_second": rate(self.lines),
+            "bytes_per_second": rate(self.bytes),
+            "rows_per_second": rate(self.rows),
+            "skipped": dict(self.skipped),
+            "errors": list(self.errors),
+            "peak_rss_mb": peakRssMb()
+        }
+
+    def report(self, format="table", file=None):
+        """ writes the statistics to file (default is standard error, standard output may hold the table)
+            Parameters:
+                format - table for people, json for one JSON object per line
+                file - open file or path, a path is appended to
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "a") as f:
+                return self.report(format, f)
+        file = file or sys.stderr
+        stats = self.asDict()
+        if format == "json":
+            print(json.dumps(stats), file=file)
+            return
+
+        seconds = stats["seconds"]
+        out = [f"{stats['tool']} statistics" + (f" - {stats['source']}" if stats["source"] else "")]
+        out.append(f"  {'phase':<32} {'seconds':>10} {'share':>7}")
+        other = seconds - sum(stats["phases"].values())
+        for name, phaseSeconds in list(stats["phases"].items()) + [("other", other)]:
+            share = phaseSeconds / seconds * 100 if seconds > 0 else 0
+            out.append(f"  {name:<32} {phaseSeconds:>10.3f} {share:>6.1f}%")
+        out.append(f"  {'total':<32} {seconds:>10.3f}")
+        for name, count in (("lines", stats["lines"]), ("bytes", stats["bytes"]), ("rows", stats["rows"])):
+            perSecond = stats[name + "_per_second"]
+            out.append(f"  {name:<32} {count:>14,}" + (f"  {perSecond:,.0f}/s" if perSecond is not None else ""))
+        for reason, count in stats["skipped"].items():
+            out.append(f"  {'skipped: ' + reason:<32} {count:>14,}")
+        for error in stats["errors"]:
+            out.append(f"  error after {error['lines_read']:,} lines: {error['error']}")
+        if stats["peak_rss_mb"] is not None:
+            out.append(f"  {'peak RSS (MB)':<32} {stats['peak_rss_mb']:>14,.1f}")
+        print("\n".join(out), file=file)
@@ -0,0 +1,197 @@
+""" Reading and writing of the tables passed between the pipeline stages
+    (log2csv -> csvMerge -> csvPlot / improved_plot / akmlGen).
+
+    CSV stays the default. Parquet and Feather keep dtypes and datetime columns,
+    need no float formatting or date parsing and can load a subset of columns.
+    The format is picked from the file extension unless it is given explicitly.
+    Parquet and Feather need pyarrow.
+"""
+import os
+import pandas as pd
+
+FORMATS = ("csv", "parquet", "feather")
+
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather"
+}
+
+# Extension added to output names that have none of the known ones
+DEFAULT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+
+def tableFormat(path, format=None):
+    """ returns the format of path: the given format, else the one of its extension, else csv """
+    if format:
+        return format
+    if not isinstance(path, (str, os.PathLike)):
+        return "csv" # open file objects, e.g. sys.stdout
+    return FORMAT_EXTENSIONS.get(os.path.splitext(str(path))[1].lower(), "csv")
+
+
+def outputName(path, format=None):
+    """ adds the extension of the output format to path unless it already has it """
+    format = tableFormat(path, format)
+    if FORMAT_EXTENSIONS.get(os.path.splitext(str(path))[1].lower()) == format:
+        return str(path)
+    return str(path) + DEFAULT_EXTENSIONS[format]
+
+
+def _requirePyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Feather tables need pyarrow, install it with: pip install pyarrow")
+
+
+def _columnNames(path, format):
+    pa = _requirePyarrow()
+    if format == "parquet":
+        import pyarrow.parquet
+        return pyarrow.parquet.read_schema(path).names
+    import pyarrow.ipc
+    with pa.memory_map(str(path)) as source:
+        return pyarrow.ipc.open_file(source).schema.names
+
+
+def inferNumbers(df):
+    """ converts the text columns of df that only hold numbers, as read_csv would do
+        when reading them back. Parsers emit many numbers as text, and Parquet or
+        Feather would otherwise store them as strings.
+    """
+    converted = {}
+    for col in df.columns:
+        if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            try:
+                converted[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    return df.assign(**converted) if converted else df
+
+
+def decategorize(df):
+    """ converts the categorical columns of df to their plain values. The category codes of
+        a parser depend on the order values show up in, they are not worth storing, and
+        categorical columns read back from Parquet or Feather would not interpolate.
+    """
+    categorical = {col: df[col].astype(df[col].cat.categories.dtype)
+                   for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+    return df.assign(**categorical) if categorical else df
+
+
+def readTable(path, columns=None, index_col=None, parse_dates=False, format=None):
+    """ reads a CSV, Parquet or Feather table
+        Parameters:
+            path - file to read, CSV may also be an open file
+            columns - only load these columns (plus index_col), missing ones are ignored
+            index_col - column to use as index
+            parse_dates - parse the index as dates, Parquet and Feather only parse it when it
+                          was stored as text (e.g. the time column of vehicleOut logs)
+            format - csv, parquet or feather, default is from the extension of path
+        Returns:
+            DataFrame
+    """
+    format = tableFormat(path, format)
+    wanted = None
+    if columns is not None:
+        wanted = list(dict.fromkeys(([index_col] if index_col else []) + list(columns)))
+
+    if format == "csv":
+        usecols = None if wanted is None else (lambda col: col in wanted)
+        return pd.read_csv(path, index_col=index_col, usecols=usecols, parse_dates=parse_dates)
+
+    if wanted is not None:
+        available = _columnNames(path, format)
+        wanted = [col for col in wanted if col in available]
+    if format == "parquet":
+        df = pd.read_parquet(path, columns=wanted)
+    else:
+        _requirePyarrow()
+        df = pd.read_feather(path, columns=wanted)
+    if index_col and index_col in df.columns:
+        df = df.set_index(index_col)
+        if parse_dates and not pd.api.types.is_datetime64_any_dtype(df.index):
+            df.index = pd.to_datetime(df.index)
+    return df
+
+
+def writeTable(df, path, format=None, index=True, float_format=None, date_format=None):
+    """ writes df as a CSV, Parquet or Feather table
+        Parameters:
+            df - DataFrame to write
+            path - output file, CSV may also be an open file
+            format - csv, parquet or feather, default is from the extension of path
+            index - also write the index, as a regular column in Parquet and Feather
+            float_format, date_format - CSV only, as in DataFrame.to_csv
+    """
+    format = tableFormat(path, format)
+    if format == "csv":
+        df.to_csv(path, index=index, float_format=float_format, date_format=date_format)
+        return
+    _requirePyarrow()
+    if index:
+        df = df.reset_index()
+    df = inferNumbers(decategorize(df))
+    if format == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+
+class TableWriter:
+    """ writes a table chunk by chunk, so it never has to be in memory as a whole.
+        All chunks must have the columns of the first one; Parquet and Feather also
+        cast every chunk to the column types of the first one. Categorical columns are
+        stored as their plain values there (see decategorize), as writeTable does.
+    """
+    def __init__(self, path, format=None, date_format=None):
+        self.path = path
+        self.format = tableFormat(path, format)
+        self.date_format = date_format
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        if self.format == "csv":
+            header = self._file is None
+            if header:
+                self._file = open(self.path, "w", newline="")
+            df.to_csv(self._file, index=False, header=header, date_format=self.date_format)
+            return
+
+        pa = _requirePyarrow()
+        table = pa.Table.from_pandas(inferNumbers(decategorize(df)), preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == "parquet":
+                import pyarrow.parquet
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+            else:
+                import pyarrow.ipc
+                self._writer = pyarrow.ipc.new_file(self.path, self._schema)
+        if not table.schema.equals(self._schema):
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+
+    def flush(self):
+        # Makes the rows written so far visible to readers of a CSV.
+        # Parquet and Feather files can only be read once closed.
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()